@@ -35,6 +35,14 @@ EXIT_BUDGET_EXCEEDED = 2
 EXIT_STAGNATION = 3
 
 
+def _read_gate_text(path: Path) -> str:
+    """Read CLAUDE.md as UTF-8 without a leading BOM, with CRLF/CR newlines as LF."""
+    raw = path.read_bytes()
+    if raw[:3] == b"\xef\xbb\xbf":
+        raw = raw[3:]
+    return raw.replace(b"\r\n", b"\n").replace(b"\r", b"\n").decode("utf-8")
+
+
 class JsonFormatter(logging.Formatter):
     """Structured JSON log formatter for machine-readable output."""
 
@@ -92,6 +100,8 @@ class LoopDriver:
 
     def _check_gate_exists_at_start(self) -> bool:
         """Check if CLAUDE.md has a Completion Gate section at startup."""
+        if not self.config.completion_gate.enabled:
+            return False  # Only read by _validate_completion_gate, which skips when disabled
         claude_md = self.project_path / "CLAUDE.md"
         checked, unchecked = self._parse_completion_gate(claude_md)
         return bool(checked or unchecked)
@@ -1098,7 +1108,7 @@ class LoopDriver:
         if not claude_md_path.exists():
             return ([], [])
         try:
-            content = claude_md_path.read_text(encoding="utf-8-sig").replace("\r\n", "\n")
+            content = _read_gate_text(claude_md_path)
         except OSError as e:
             logger.warning("Failed to read CLAUDE.md for gate: %s", e)
             return ([], [])
@@ -1115,11 +1125,17 @@ class LoopDriver:
             if in_gate and line.startswith("#"):
                 break
             if in_gate:
-                s = line.strip()
-                if s.startswith("- [x]") or s.startswith("- [X]"):
-                    checked.append(s[5:].strip())
-                elif s.startswith("- [ ]"):
+                # Checklist item, after lstrip():
+                #   "- [x] text"   checked ("x" or "X")
+                #   "- [ ] text"   unchecked
+                #    012345        s[3] is the mark, s[4] the "]", text from s[5]
+                s = line.lstrip()
+                if not s.startswith("- [") or s[4:5] != "]":
+                    continue
+                if s[3] == " ":
                     unchecked.append(s[5:].strip())
+                elif s[3] in "xX":
+                    checked.append(s[5:].strip())
         return (checked, unchecked)
 
     def _validate_completion_gate(self, parsed: ParsedStream) -> tuple[bool, Optional[str]]:
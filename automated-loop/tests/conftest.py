@@ -4,29 +4,78 @@ Non-fixture helpers (mock builders, NDJSON stream builders) are in helpers.py.
 """
 
 import json
+import shutil
 import sys
 from pathlib import Path
+from unittest.mock import MagicMock
 
 import pytest
 
 # Add the tests directory to sys.path so test files can import helpers.py
 sys.path.insert(0, str(Path(__file__).parent))
 
+from helpers import stub_watchdog_timer  # noqa: E402
 
-@pytest.fixture
-def project_dir(tmp_path: Path) -> Path:
-    """Create a fully populated project directory.
 
-    Includes: .workflow/, CLAUDE.md, MEMORY.md, .workflow/config.json.
-    Tests needing a bare directory should use tmp_path directly.
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line(
+        "markers",
+        "no_timer: replace loop_driver's threading.Timer with a no-op mock",
+    )
+    config.addinivalue_line(
+        "markers",
+        "needs_workflow_files: keep real trace.jsonl, metrics_summary.json and state.json writes "
+        "(otherwise StateTracker.save and the trace/metrics writers are no-ops)",
+    )
+    config.addinivalue_line(
+        "markers",
+        "preflight: run LoopDriver._preflight_check instead of stubbing it out",
+    )
+    config.addinivalue_line(
+        "markers",
+        "integration: multi-iteration driver.run() loops (deselect with -m 'not integration')",
+    )
+
+
+@pytest.fixture(autouse=True)
+def _no_timer(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Skip spawning a real watchdog thread per iteration for no_timer tests.
+
+    Tests that assert on Timer args install their own mock from a regular
+    fixture; autouse fixtures run first, so that mock takes precedence.
     """
-    workflow_dir = tmp_path / ".workflow"
+    if request.node.get_closest_marker("no_timer") is None:
+        return
+    stub_watchdog_timer(monkeypatch)
+
+
+@pytest.fixture
+def mock_run(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    """subprocess.run replaced via monkeypatch (cheaper than a @patch per test)."""
+    run_mock = MagicMock()
+    monkeypatch.setattr("subprocess.run", run_mock)
+    return run_mock
+
+
+@pytest.fixture
+def mock_popen(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    """subprocess.Popen replaced via monkeypatch, for tests that inspect its calls."""
+    popen_mock = MagicMock()
+    monkeypatch.setattr("subprocess.Popen", popen_mock)
+    return popen_mock
+
+
+@pytest.fixture(scope="session")
+def _project_template(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Build the populated project skeleton once per session."""
+    template = tmp_path_factory.mktemp("tmpl")
+    workflow_dir = template / ".workflow"
     workflow_dir.mkdir()
 
-    (tmp_path / "CLAUDE.md").write_text(
+    (template / "CLAUDE.md").write_text(
         "# Test Project\nAutomated loop test.", encoding="utf-8"
     )
-    (tmp_path / "MEMORY.md").write_text(
+    (template / "MEMORY.md").write_text(
         "# Key Learnings\n- Integration tests work.", encoding="utf-8"
     )
 
@@ -36,4 +85,40 @@ def project_dir(tmp_path: Path) -> Path:
     }
     (workflow_dir / "config.json").write_text(json.dumps(config), encoding="utf-8")
 
-    return tmp_path
+    return template
+
+
+@pytest.fixture
+def project_dir(_project_template: Path, tmp_path: Path) -> Path:
+    """Create a fully populated project directory.
+
+    Includes: .workflow/, CLAUDE.md, MEMORY.md, .workflow/config.json.
+    Each test gets its own copy of the session template.
+    Tests needing a bare directory should use tmp_path directly.
+    """
+    return Path(shutil.copytree(_project_template, tmp_path / "p"))
+
+
+@pytest.fixture(scope="session")
+def project_template(_project_template: Path) -> Path:
+    """The shared session project skeleton itself, without a per-test copy.
+
+    Only for tests that construct a LoopDriver or run its checks without
+    writing to the project (no run(), no CLAUDE.md edits). Session-scoped
+    so class-scoped fixtures can copy it.
+    """
+    return _project_template
+
+
+@pytest.fixture(scope="session")
+def git_project_template(
+    _project_template: Path, tmp_path_factory: pytest.TempPathFactory,
+) -> Path:
+    """The session project skeleton plus an empty .git/, built once per session.
+
+    Same read-only contract as project_template: for preflight checks that
+    only look for .workflow/, CLAUDE.md and .git/.
+    """
+    template = Path(shutil.copytree(_project_template, tmp_path_factory.mktemp("gittmpl") / "p"))
+    (template / ".git").mkdir()
+    return template
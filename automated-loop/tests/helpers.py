@@ -4,13 +4,19 @@ Fixtures are in conftest.py. This module contains non-fixture helpers
 (mock builders, NDJSON stream builders) used across multiple test files.
 """
 
+import functools
 import io
+import itertools
 import json
+from types import SimpleNamespace
 from unittest.mock import MagicMock
 
+from ndjson_parser import ParsedStream, parse_ndjson_string, process_events
+
 
 # --- NDJSON stream builders ---
 
+@functools.lru_cache(maxsize=256)
 def build_ndjson_stream(
     session_id: str,
     cost: float,
@@ -43,10 +49,38 @@ def build_ndjson_stream(
     return "\n".join(lines)
 
 
+@functools.lru_cache(maxsize=256)
+def build_ndjson_bytes(*args, **kwargs) -> bytes:
+    """build_ndjson_stream, UTF-8 encoded once per distinct argument set."""
+    return build_ndjson_stream(*args, **kwargs).encode("utf-8")
+
+
+def build_parsed_stream(*args, **kwargs) -> ParsedStream:
+    """A fresh ParsedStream for build_ndjson_stream(*args, **kwargs).
+
+    For tests that replace LoopDriver._invoke_claude and so skip the Popen
+    and line-reading path entirely. Not memoized: the driver keeps the result.
+    """
+    return process_events(parse_ndjson_string(build_ndjson_stream(*args, **kwargs)))
+
+
 # --- Subprocess mock helpers ---
 
+# Default no-op subprocess.run result. Callers only read returncode/stdout/
+# stderr, so a SimpleNamespace shared across calls is enough.
+DEFAULT_RUN_RESULT = SimpleNamespace(returncode=0, stdout="", stderr="")
+
+# Successful ``claude --version`` result for preflight checks, shared likewise.
+CLAUDE_VERSION_RESULT = SimpleNamespace(returncode=0, stdout="claude 1.0.0\n", stderr="")
+
+
+@functools.lru_cache(maxsize=None)
 def mock_playwright_result(synthesis: str = "Keep going") -> MagicMock:
-    """Build a mock subprocess result for Playwright research."""
+    """Build a mock subprocess result for Playwright research.
+
+    Memoized: the result is read-only to callers, so one instance per
+    synthesis is shared across tests.
+    """
     return MagicMock(
         returncode=0,
         stdout=json.dumps({
@@ -59,10 +93,11 @@ def mock_playwright_result(synthesis: str = "Keep going") -> MagicMock:
     )
 
 
+@functools.lru_cache(maxsize=None)
 def mock_verification_result(
     verdict: str = "APPROVED", issues: str = "None"
 ) -> MagicMock:
-    """Build a mock subprocess result for plan verification."""
+    """Build a mock subprocess result for plan verification. Memoized."""
     synthesis = (
         f"VERDICT: {verdict}\n"
         f"ISSUES: {issues}\n"
@@ -81,10 +116,11 @@ def mock_verification_result(
     )
 
 
+@functools.lru_cache(maxsize=None)
 def mock_post_review_result(
     verdict: str = "PASS", assessment: str = "All implementations look good"
 ) -> MagicMock:
-    """Build a mock subprocess result for post-completion review."""
+    """Build a mock subprocess result for post-completion review. Memoized."""
     synthesis = (
         f"VERDICT: {verdict}\n"
         f"OVERALL_ASSESSMENT: {assessment}\n"
@@ -102,8 +138,9 @@ def mock_post_review_result(
     )
 
 
+@functools.lru_cache(maxsize=None)
 def mock_playwright_error(error: str = "Browser timeout") -> MagicMock:
-    """Build a mock subprocess result for Playwright error."""
+    """Build a mock subprocess result for Playwright error. Memoized."""
     return MagicMock(
         returncode=0,
         stdout=json.dumps({
@@ -115,8 +152,9 @@ def mock_playwright_error(error: str = "Browser timeout") -> MagicMock:
     )
 
 
+@functools.lru_cache(maxsize=None)
 def mock_git_log_result() -> MagicMock:
-    """Mock result for git log (not a git repo)."""
+    """Mock result for git log (not a git repo). Memoized, like mock_playwright_result."""
     return MagicMock(returncode=128, stdout="", stderr="not a git repo")
 
 
@@ -137,6 +175,17 @@ def mock_test_result(passed: bool = True, stdout: str = "") -> MagicMock:
     )
 
 
+def is_claude_call(args: tuple, kwargs: dict) -> bool:
+    """True if a subprocess call's argv (positional or args=) starts with ``claude``."""
+    cmd = args[0] if args else kwargs.get("args", ())
+    return isinstance(cmd, list) and bool(cmd) and cmd[0] == "claude"
+
+
+def is_council_browser_cmd(cmd: list) -> bool:
+    """True if any string argv element names council_browser (no str(list) copy)."""
+    return any(isinstance(a, str) and "council_browser" in a for a in cmd)
+
+
 def make_subprocess_dispatcher(
     claude_result=None,
     claude_side_effect=None,
@@ -164,11 +213,11 @@ def make_subprocess_dispatcher(
                 return mock_git_log_result()
             if cmd[0] == "claude":
                 if len(cmd) >= 2 and cmd[1] == "--version":
-                    return MagicMock(returncode=0, stdout="claude 1.0.0-test\n", stderr="")
+                    return CLAUDE_VERSION_RESULT
                 if claude_side_effect is not None:
                     raise claude_side_effect
                 return claude_result
-            if "council_browser" in str(cmd):
+            if is_council_browser_cmd(cmd):
                 if research_side_effect is not None:
                     raise research_side_effect
                 return research_result
@@ -182,7 +231,7 @@ def make_subprocess_dispatcher(
         # Default fallback
         if claude_result is not None:
             return claude_result
-        return MagicMock(returncode=0, stdout="", stderr="")
+        return DEFAULT_RUN_RESULT
 
     return side_effect
 
@@ -221,14 +270,48 @@ def make_research_dispatcher(
 
 # --- Popen mock for streaming NDJSON (replaces subprocess.run for Claude CLI) ---
 
+def _as_bytes(ndjson_stream: str | bytes | None) -> bytes:
+    if isinstance(ndjson_stream, bytes):
+        return ndjson_stream
+    return (ndjson_stream or "").encode("utf-8")
+
+
+class SharedLineReader:
+    """Read-only, line-oriented text view over a shared NDJSON byte buffer.
+
+    Only the cursor is per-instance, so repeated MockPopen instances built
+    from the same bytes don't copy the stream.
+    """
+
+    __slots__ = ("_data", "_mv", "_pos")
+
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._mv = memoryview(data)
+        self._pos = 0
+
+    def readline(self) -> str:
+        pos = self._pos
+        end = self._data.find(b"\n", pos)
+        end = len(self._data) if end < 0 else end + 1
+        self._pos = end
+        return str(self._mv[pos:end], "utf-8")
+
+    def __iter__(self):
+        return iter(self.readline, "")
+
+
 class MockPopen:
     """Mock subprocess.Popen that yields NDJSON lines from stdout.
 
     Used for testing _invoke_claude which reads stdout line-by-line.
+    Accepts pre-encoded bytes so factories can share one buffer across calls.
     """
 
-    def __init__(self, ndjson_stream: str, returncode: int = 0) -> None:
-        self.stdout = io.StringIO(ndjson_stream)
+    __slots__ = ("stdout", "stderr", "returncode", "pid")
+
+    def __init__(self, ndjson_stream: str | bytes, returncode: int = 0) -> None:
+        self.stdout = SharedLineReader(_as_bytes(ndjson_stream))
         self.stderr = io.StringIO("")
         self.returncode = returncode
         self.pid = 99999
@@ -240,31 +323,94 @@ class MockPopen:
         pass
 
 
+# Empty streams have no read state to consume, so one instance is shared by
+# every non-claude (taskkill) and simulated-timeout Popen call.
+EMPTY_POPEN = MockPopen(b"")
+
+
 def make_popen_factory(
-    ndjson_stream: str, returncode: int = 0
+    ndjson_stream: str | bytes, returncode: int = 0
 ):
     """Create a factory for subprocess.Popen mock (returns MockPopen)."""
+    data = _as_bytes(ndjson_stream)
+
     def factory(*args, **kwargs):
-        return MockPopen(ndjson_stream, returncode)
+        return MockPopen(data, returncode)
     return factory
 
 
 def make_popen_dispatcher(
-    claude_ndjson: str | None = None,
+    claude_ndjson: str | bytes | None = None,
     claude_returncode: int = 0,
     claude_side_effect: Exception | None = None,
+    claude_calls: list | None = None,
 ):
     """Create a side_effect for subprocess.Popen mock.
 
     Claude commands return MockPopen with NDJSON stream.
     Non-Claude Popen calls (e.g. taskkill) return a no-op MockPopen.
+    If claude_calls is given, each claude argv is appended to it.
     """
+    claude_data = _as_bytes(claude_ndjson)
+
     def factory(*args, **kwargs):
-        cmd = args[0] if args else kwargs.get("args", [])
-        if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+        if is_claude_call(args, kwargs):
+            if claude_calls is not None:
+                claude_calls.append(args[0] if args else kwargs["args"])
             if claude_side_effect is not None:
                 raise claude_side_effect
-            return MockPopen(claude_ndjson or "", claude_returncode)
+            return MockPopen(claude_data, claude_returncode)
         # taskkill or other subprocess.Popen calls
-        return MockPopen("", 0)
+        return EMPTY_POPEN
     return factory
+
+
+def make_counting_claude_popen(
+    n: int, result_text: str, claude_calls: list | None = None,
+):
+    """Create a Popen side_effect giving each claude call its own session s1..sn.
+
+    The n streams are built and encoded up front; a call past n raises
+    AssertionError. If claude_calls is given, each claude argv is appended to it.
+    """
+    streams = [
+        build_ndjson_bytes(f"s{i}", 0.01, 5, result_text)
+        for i in range(1, n + 1)
+    ]
+    count = 0
+
+    def factory(*args, **kwargs):
+        nonlocal count
+        if is_claude_call(args, kwargs):
+            count += 1
+            if count > n:
+                raise AssertionError(f"unexpected claude call #{count}")
+            if claude_calls is not None:
+                claude_calls.append(args[0] if args else kwargs["args"])
+            return MockPopen(streams[count - 1])
+        return EMPTY_POPEN
+    return factory
+
+
+# --- Stubs shared by autouse fixtures and class-scoped loop runs ---
+
+def stub_watchdog_timer(monkeypatch) -> None:
+    """Replace loop_driver's threading.Timer with a no-op mock (no_timer marker)."""
+    import loop_driver
+
+    monkeypatch.setattr(
+        loop_driver.threading, "Timer",
+        MagicMock(return_value=MagicMock(start=MagicMock(), cancel=MagicMock())),
+    )
+
+
+# --- Popen call inspection ---
+
+def claude_popen_calls(mock_popen: MagicMock):
+    """Lazily yield the recorded Popen calls that spawned the claude CLI."""
+    return (c for c in mock_popen.call_args_list if is_claude_call(*c))
+
+
+def nth_claude_call(mock_popen: MagicMock, n: int):
+    """Return the nth (0-based) claude Popen call, or None; stops at the nth match."""
+    return next(itertools.islice(claude_popen_calls(mock_popen), n, n + 1), None)
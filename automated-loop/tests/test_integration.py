@@ -15,7 +15,13 @@ from research_bridge import ResearchBridge
 from state_tracker import CURRENT_STATE_VERSION, StateTracker
 
 from helpers import (
+    DEFAULT_RUN_RESULT,
+    EMPTY_POPEN,
+    build_ndjson_bytes,
     build_ndjson_stream,
+    claude_popen_calls,
+    is_claude_call,
+    is_council_browser_cmd,
     make_popen_dispatcher,
     make_subprocess_dispatcher,
     mock_git_log_result,
@@ -307,8 +313,6 @@ class TestFullCycleRoundtrip:
 class TestLoopDriverEndToEnd:
     """Full LoopDriver-level integration tests exercising the real run() method."""
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_full_loop_with_resume_and_completion(
         self, mock_run: MagicMock, mock_popen: MagicMock, project_dir: Path
     ) -> None:
@@ -316,27 +320,26 @@ class TestLoopDriverEndToEnd:
         call_count = [0]
 
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+            if is_claude_call(args, kwargs):
                 call_count[0] += 1
                 if call_count[0] == 1:
                     return MockPopen(
-                        build_ndjson_stream("s1", 0.02, 2, "Working on feature...")
+                        build_ndjson_bytes("s1", 0.02, 2, "Working on feature...")
                     )
                 else:
                     return MockPopen(
-                        build_ndjson_stream("s2", 0.03, 3, "All done. PROJECT_COMPLETE")
+                        build_ndjson_bytes("s2", 0.03, 3, "All done. PROJECT_COMPLETE")
                     )
-            return MockPopen("", 0)
+            return EMPTY_POPEN
 
         def run_side_effect(*args, **kwargs):
             cmd = args[0] if args else kwargs.get("args", [])
             if isinstance(cmd, list) and cmd:
                 if cmd[0] == "git":
                     return mock_git_log_result()
-                if "council_browser" in str(cmd):
+                if is_council_browser_cmd(cmd):
                     return mock_playwright_result("Continue with next step")
-            return MagicMock(returncode=0, stdout="", stderr="")
+            return DEFAULT_RUN_RESULT
 
         mock_popen.side_effect = popen_side_effect
         mock_run.side_effect = run_side_effect
@@ -356,17 +359,12 @@ class TestLoopDriverEndToEnd:
         assert driver.tracker.state.last_session_id == "s2"
 
         # Verify second Claude call includes --resume s1
-        claude_calls = [
-            c for c in mock_popen.call_args_list
-            if c[0] and isinstance(c[0][0], list) and c[0][0] and c[0][0][0] == "claude"
-        ]
+        claude_calls = list(claude_popen_calls(mock_popen))
         assert len(claude_calls) == 2
         second_args = claude_calls[1][0][0]
         assert "--resume" in second_args
         assert second_args[second_args.index("--resume") + 1] == "s1"
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_error_recovery_then_completion(
         self, mock_run: MagicMock, mock_popen: MagicMock, project_dir: Path
     ) -> None:
@@ -374,29 +372,28 @@ class TestLoopDriverEndToEnd:
         call_count = [0]
 
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+            if is_claude_call(args, kwargs):
                 call_count[0] += 1
                 if call_count[0] == 1:
                     return MockPopen(
-                        build_ndjson_stream(
+                        build_ndjson_bytes(
                             "err-1", 0.01, 1, "Error: something broke", is_error=True
                         )
                     )
                 else:
                     return MockPopen(
-                        build_ndjson_stream("s2", 0.02, 2, "PROJECT_COMPLETE")
+                        build_ndjson_bytes("s2", 0.02, 2, "PROJECT_COMPLETE")
                     )
-            return MockPopen("", 0)
+            return EMPTY_POPEN
 
         def run_side_effect(*args, **kwargs):
             cmd = args[0] if args else kwargs.get("args", [])
             if isinstance(cmd, list) and cmd:
                 if cmd[0] == "git":
                     return mock_git_log_result()
-                if "council_browser" in str(cmd):
+                if is_council_browser_cmd(cmd):
                     return mock_playwright_result()
-            return MagicMock(returncode=0, stdout="", stderr="")
+            return DEFAULT_RUN_RESULT
 
         mock_popen.side_effect = popen_side_effect
         mock_run.side_effect = run_side_effect
@@ -413,14 +410,12 @@ class TestLoopDriverEndToEnd:
         assert exit_code == EXIT_COMPLETE
         assert driver.tracker.get_metrics().error_count == 1
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_budget_halt_mid_loop(
         self, mock_run: MagicMock, mock_popen: MagicMock, project_dir: Path
     ) -> None:
         """Budget exceeded in first iteration halts the loop."""
         mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.12, 1, "Expensive work..."),
+            claude_ndjson=build_ndjson_bytes("s1", 0.12, 1, "Expensive work..."),
         )
         mock_run.side_effect = make_subprocess_dispatcher(
             research_result=mock_playwright_result(),
@@ -1,18 +1,32 @@
 """Tests for loop_driver module."""
 
+import functools
 import json
 import logging
+import re
+import shutil
 import subprocess as sp
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from typing import Callable, Iterable, Optional, Sequence
+from unittest.mock import MagicMock
 
 import pytest
 
-from config import WorkflowConfig
+from config import Result, WorkflowConfig
 from loop_driver import EXIT_BUDGET_EXCEEDED, EXIT_COMPLETE, EXIT_MAX_ITERATIONS, EXIT_STAGNATION, JsonFormatter, LoopDriver
+from ndjson_parser import ParsedStream
+from state_tracker import StateTracker
 
 from helpers import (
-    build_ndjson_stream,
+    CLAUDE_VERSION_RESULT,
+    DEFAULT_RUN_RESULT,
+    EMPTY_POPEN,
+    build_ndjson_bytes,
+    build_parsed_stream,
+    claude_popen_calls,
+    is_claude_call,
+    is_council_browser_cmd,
+    make_counting_claude_popen,
     make_popen_dispatcher,
     make_subprocess_dispatcher,
     mock_git_diff_stat_result,
@@ -22,11 +36,69 @@ from helpers import (
     mock_test_result,
     mock_verification_result,
     MockPopen,
+    nth_claude_call,
+    stub_watchdog_timer,
 )
 
+# Streams shared by several tests, built and encoded once at import
+_NDJSON_COMPLETE = build_ndjson_bytes("s1", 0.01, 1, "PROJECT_COMPLETE")
+_NDJSON_COMPLETE_2_TURNS = build_ndjson_bytes("s1", 0.05, 2, "PROJECT_COMPLETE")
+_NDJSON_COMPLETE_5_TURNS = build_ndjson_bytes("s1", 0.01, 5, "PROJECT_COMPLETE")
+_NDJSON_COMPLETE_10_TURNS = build_ndjson_bytes("s1", 0.50, 10, "PROJECT_COMPLETE")
+_NDJSON_WORKING = build_ndjson_bytes("s1", 0.01, 1, "Working...")
+_NDJSON_WORKING_5_TURNS = build_ndjson_bytes("s1", 0.01, 5, "Working...")
+_NDJSON_LOW_TURN = build_ndjson_bytes("s1", 0.01, 1, "Thinking...")
+_NDJSON_OVER_BUDGET = build_ndjson_bytes("s1", 10.0, 1, "Expensive")
 
-@pytest.fixture
-def config() -> WorkflowConfig:
+# Markers that distinguish a verification query from a plain research query
+_VERIFICATION_RE = re.compile(r"VERDICT|Critically evaluate")
+
+# No test here relies on the watchdog firing; TestModelAwareTimeout uses the
+# mock_timer fixture to inspect Timer args.
+pytestmark = pytest.mark.no_timer
+
+
+def _stub_workflow_writes(mp: pytest.MonkeyPatch) -> None:
+    """Make trace/metrics/state writes no-ops."""
+    mp.setattr(LoopDriver, "_write_trace_event", lambda *a, **k: None)
+    mp.setattr(LoopDriver, "_write_metrics_summary", lambda *a, **k: None)
+    mp.setattr(StateTracker, "save", lambda self: Result.ok(None))
+
+
+def _stub_preflight(mp: pytest.MonkeyPatch) -> None:
+    """Treat preflight as passed."""
+    mp.setattr(LoopDriver, "_preflight_check", lambda self: True)
+
+
+def _install_workflow_stubs(mp: pytest.MonkeyPatch, *, workflow_writes: bool = True) -> None:
+    """Apply the autouse fixtures' stubs for an unmarked test.
+
+    For class-scoped fixtures, which run before function-scoped autouse
+    patches are active. workflow_writes=False matches needs_workflow_files.
+    """
+    stub_watchdog_timer(mp)
+    _stub_preflight(mp)
+    if workflow_writes:
+        _stub_workflow_writes(mp)
+
+
+@pytest.fixture(autouse=True)
+def _elide_workflow_writes(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Turn trace/metrics/state writes into no-ops unless the test reads them back."""
+    if request.node.get_closest_marker("needs_workflow_files") is not None:
+        return
+    _stub_workflow_writes(monkeypatch)
+
+
+@pytest.fixture(autouse=True)
+def _skip_preflight(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Treat preflight as passed unless the test is marked preflight."""
+    if request.node.get_closest_marker("preflight") is not None:
+        return
+    _stub_preflight(monkeypatch)
+
+
+def _make_config() -> WorkflowConfig:
     return WorkflowConfig(
         limits={
             "max_iterations": 3,
@@ -39,87 +111,199 @@ def config() -> WorkflowConfig:
     )
 
 
+@pytest.fixture
+def config() -> WorkflowConfig:
+    return _make_config()
+
+
+@pytest.fixture
+def mock_timer(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    """threading.Timer replaced with a no-op mock whose call args can be inspected."""
+    timer_mock = MagicMock(return_value=MagicMock())
+    monkeypatch.setattr("loop_driver.threading.Timer", timer_mock)
+    return timer_mock
+
+
+@functools.lru_cache(maxsize=None)
+def _popen_dispatcher(claude_ndjson: str | bytes | None = None):
+    """Shared Popen dispatcher per stream; without claude_calls it holds no state."""
+    return make_popen_dispatcher(claude_ndjson=claude_ndjson)
+
+
+@functools.lru_cache(maxsize=64)
+def _run_dispatcher(**run_kwargs):
+    """Shared subprocess.run dispatcher per argument set; it holds no state."""
+    return make_subprocess_dispatcher(**run_kwargs)
+
+
+_DEFAULT_RUN_DISPATCHER = _run_dispatcher()
+_RESEARCH_RUN_DISPATCHER = _run_dispatcher(research_result=mock_playwright_result())
+
+
+@pytest.fixture
+def dispatchers(
+    mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
+) -> Callable[..., None]:
+    """Install Popen and subprocess.run dispatchers in one call.
+
+    claude_ndjson goes to make_popen_dispatcher; all other keyword
+    arguments are forwarded to make_subprocess_dispatcher. Both are
+    shared across tests that pass the same arguments.
+    """
+    def _install(*, claude_ndjson: str | bytes | None = None, **run_kwargs) -> None:
+        monkeypatch.setattr(
+            "subprocess.Popen", _popen_dispatcher(claude_ndjson),
+        )
+        mock_run.side_effect = _run_dispatcher(**run_kwargs)
+    return _install
+
+
+def _trace_capture(events: list[dict]) -> Callable[..., None]:
+    """Build a _write_trace_event replacement that appends to events."""
+    def _capture(self: LoopDriver, event_type: str, **data) -> None:
+        events.append({
+            "event_type": event_type,
+            "iteration": self.tracker.state.iteration,
+            **data,
+        })
+    return _capture
+
+
+@pytest.fixture
+def trace_events(monkeypatch: pytest.MonkeyPatch) -> list[dict]:
+    """Capture trace events in memory instead of appending to trace.jsonl."""
+    events: list[dict] = []
+    monkeypatch.setattr(LoopDriver, "_write_trace_event", _trace_capture(events))
+    return events
+
+
+def _fake_invoke_claude(
+    monkeypatch: pytest.MonkeyPatch, streams: Iterable[ParsedStream],
+) -> list[str]:
+    """Replace LoopDriver._invoke_claude with pre-parsed results, one per call.
+
+    For tests that only assert on what run() does with Claude's output: no
+    Popen, watchdog or NDJSON line reading. An empty ParsedStream is what
+    _invoke_claude returns on timeout. Returns the model used for each call.
+    """
+    results = iter(streams)
+    models: list[str] = []
+
+    def _invoke(self: LoopDriver, prompt: str, resume_session_id: Optional[str] = None):
+        models.append(self.config.claude.model)
+        return next(results)
+
+    monkeypatch.setattr(LoopDriver, "_invoke_claude", _invoke)
+    return models
+
+
+def _load_trace(path: Path) -> list[dict]:
+    """Parse every event in trace.jsonl with one json.loads over a JSON array."""
+    lines = [line for line in path.read_bytes().splitlines() if line.strip()]
+    return json.loads(b"[" + b",".join(lines) + b"]")
+
+
+def _load_event_types(project_dir: Path) -> set[str]:
+    """Parse the project's trace.jsonl once and return the set of event types."""
+    return {e["event_type"] for e in _load_trace(project_dir / ".workflow" / "trace.jsonl")}
+
+
+def _events_of_type(path: Path, event_type: str) -> list[dict]:
+    """Parse trace.jsonl and keep only events of one type."""
+    return [e for e in _load_trace(path) if e["event_type"] == event_type]
+
+
+def _claude_prompt(cmd: list[str]) -> str:
+    """Return the prompt from a claude argv; _invoke_claude always builds claude -p <prompt> ..."""
+    assert cmd[1] == "-p", cmd
+    return cmd[2]
+
+
+def _write_gate_md(
+    project_dir: Path, checked: Sequence[str] = (), unchecked: Sequence[str] = (),
+) -> Path:
+    """Write a CLAUDE.md whose Completion Gate lists checked, then unchecked, items."""
+    lines = [b"# Project", b"", b"## Completion Gate"]
+    lines += [b"- [x] " + t.encode() for t in checked]
+    lines += [b"- [ ] " + t.encode() for t in unchecked]
+    claude_md = project_dir / "CLAUDE.md"
+    claude_md.write_bytes(b"\n".join(lines) + b"\n")
+    return claude_md
+
+
+def _caplog_text(caplog: pytest.LogCaptureFixture) -> str:
+    """Join captured log messages so each check is one substring search."""
+    return "\n".join(r.message for r in caplog.records)
+
+
+@pytest.fixture(scope="module")
+def shared_driver(tmp_path_factory: pytest.TempPathFactory) -> LoopDriver:
+    """One dry-run driver for tests that exercise a single helper method.
+
+    Helpers read self.config live, so tests override the fields they need
+    with monkeypatch.setattr, which restores them for the next test.
+    """
+    return LoopDriver(
+        tmp_path_factory.mktemp("driver"), WorkflowConfig(),
+        dry_run=True, skip_preflight=True,
+    )
+
+
+def _loop_run_side_effect(*args, **kwargs):
+    """subprocess.run dispatcher for multi-iteration loop tests: git + research only."""
+    cmd = args[0] if args else kwargs.get("args", [])
+    if isinstance(cmd, list) and cmd:
+        if cmd[0] == "git":
+            return mock_git_log_result()
+        if is_council_browser_cmd(cmd):
+            return mock_playwright_result()
+    return DEFAULT_RUN_RESULT
+
+
 class TestDryRun:
     def test_dry_run_completes_max_iterations(
-        self, project_dir: Path, config: WorkflowConfig
+        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig
     ) -> None:
         """Dry run simulates iterations without spawning Claude."""
-        with patch("research_bridge.subprocess.run") as mock_run:
-            mock_run.return_value = mock_playwright_result()
-            driver = LoopDriver(project_dir, config, dry_run=True)
-            exit_code = driver.run()
-            assert exit_code == EXIT_MAX_ITERATIONS
-
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+        mock_run.return_value = mock_playwright_result()
+        driver = LoopDriver(project_dir, config, dry_run=True)
+        exit_code = driver.run()
+        assert exit_code == EXIT_MAX_ITERATIONS
+
     def test_dry_run_no_claude_spawned(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Dry run never spawns Claude CLI (subprocess.Popen with 'claude' args)."""
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
-        mock_popen.side_effect = make_popen_dispatcher()
+        mock_run.side_effect = _RESEARCH_RUN_DISPATCHER
+        claude_calls: list[list[str]] = []
+        monkeypatch.setattr("subprocess.Popen", make_popen_dispatcher(claude_calls=claude_calls))
 
         driver = LoopDriver(project_dir, config, dry_run=True)
         driver.run()
 
         # Verify no Popen calls with 'claude'
-        claude_calls = [
-            c for c in mock_popen.call_args_list
-            if c[0] and isinstance(c[0][0], list) and c[0][0] and c[0][0][0] == "claude"
-        ]
-        assert len(claude_calls) == 0
+        assert claude_calls == []
 
 
 class TestCompletionDetection:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    @pytest.mark.parametrize(
+        "result_text",
+        [
+            pytest.param("All done. PROJECT_COMPLETE", id="exact"),
+            pytest.param("All done. project_complete", id="case_insensitive"),
+            pytest.param(
+                "The implementation is now PROJECT_COMPLETE and ready for review.",
+                id="embedded_in_sentence",
+            ),
+        ],
+    )
     def test_completion_marker_exits_zero(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Completion marker in output exits with code 0."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "All done. PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
-        driver = LoopDriver(project_dir, config)
-        exit_code = driver.run()
-        assert exit_code == EXIT_COMPLETE
-
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_completion_case_insensitive(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
+        result_text: str,
     ) -> None:
-        """Completion markers match case-insensitively."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "All done. project_complete"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
-        driver = LoopDriver(project_dir, config)
-        exit_code = driver.run()
-        assert exit_code == EXIT_COMPLETE
-
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_completion_partial_match(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Completion marker embedded in a sentence still matches."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream(
-                "s1", 0.01, 1,
-                "The implementation is now PROJECT_COMPLETE and ready for review."
-            ),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        """Completion marker in output exits with code 0, in any case, anywhere in the text."""
+        dispatchers(claude_ndjson=build_ndjson_bytes("s1", 0.01, 1, result_text))
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
@@ -127,17 +311,11 @@ class TestCompletionDetection:
 
 
 class TestBudgetExceeded:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_per_iteration_budget_exceeded(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Exceeding per-iteration budget exits with code 2."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 10.0, 1, "Expensive operation"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=_NDJSON_OVER_BUDGET)
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
@@ -145,17 +323,12 @@ class TestBudgetExceeded:
 
 
 class TestMaxIterations:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_max_iterations_exit_code(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Reaching max iterations exits with code 1."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "Still working..."),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=_NDJSON_WORKING,
             research_result=mock_playwright_result(),
         )
 
@@ -165,18 +338,13 @@ class TestMaxIterations:
 
 
 class TestNdjsonParsing:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_session_id_tracked(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Session ID from NDJSON is tracked for --resume."""
         config.limits.max_iterations = 1
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("sess-xyz", 0.01, 1, "Done step 1"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=build_ndjson_bytes("sess-xyz", 0.01, 1, "Done step 1"),
             research_result=mock_playwright_result(),
         )
 
@@ -187,38 +355,29 @@ class TestNdjsonParsing:
 
 
 class TestTimeoutHandling:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_timeout_records_error(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Timeout triggers error recovery path."""
         config.limits.max_iterations = 1
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        dispatchers(claude_ndjson="", research_result=mock_playwright_result())
 
         driver = LoopDriver(project_dir, config)
-        driver.run()
+        exit_code = driver.run()
 
-        assert driver.tracker.get_metrics().error_count >= 0  # Doesn't crash
+        assert exit_code == EXIT_MAX_ITERATIONS
+        assert driver._consecutive_timeouts == 1
+        assert driver.tracker.state.last_session_id is None
 
 
 class TestResearchFailureFallback:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_research_failure_uses_fallback(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Research failure falls back to generic prompt."""
         config.limits.max_iterations = 2
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "Working..."),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=_NDJSON_WORKING,
             research_side_effect=sp.TimeoutExpired(cmd="python", timeout=600),
         )
 
@@ -230,8 +389,6 @@ class TestResearchFailureFallback:
 
 
 class TestResumeSessionId:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_resume_session_passed_to_claude(
         self, mock_run: MagicMock, mock_popen: MagicMock,
         project_dir: Path, config: WorkflowConfig,
@@ -241,21 +398,20 @@ class TestResumeSessionId:
         call_count = [0]
 
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+            if is_claude_call(args, kwargs):
                 call_count[0] += 1
                 sid = f"s{call_count[0]}"
-                return MockPopen(build_ndjson_stream(sid, 0.01, 1, "Working..."))
-            return MockPopen("")  # taskkill
+                return MockPopen(build_ndjson_bytes(sid, 0.01, 1, "Working..."))
+            return EMPTY_POPEN  # taskkill
 
         def run_side_effect(*args, **kwargs):
             cmd = args[0] if args else kwargs.get("args", [])
             if isinstance(cmd, list) and cmd:
                 if cmd[0] == "git":
                     return mock_git_log_result()
-                if "council_browser" in str(cmd):
+                if is_council_browser_cmd(cmd):
                     return mock_playwright_result("Continue")
-            return MagicMock(returncode=0, stdout="", stderr="")
+            return DEFAULT_RUN_RESULT
 
         mock_popen.side_effect = popen_side_effect
         mock_run.side_effect = run_side_effect
@@ -263,22 +419,17 @@ class TestResumeSessionId:
         driver = LoopDriver(project_dir, config)
         driver.run()
 
-        # Find claude CLI calls
-        claude_calls = [
-            c for c in mock_popen.call_args_list
-            if c[0] and isinstance(c[0][0], list) and c[0][0] and c[0][0][0] == "claude"
-        ]
-        assert len(claude_calls) >= 2
+        # Find the second claude CLI call
+        second_call = nth_claude_call(mock_popen, 1)
+        assert second_call is not None
         # Second call should have --resume with s1
-        second_call_args = claude_calls[1][0][0]
+        second_call_args = second_call[0][0]
         assert "--resume" in second_call_args
         resume_idx = second_call_args.index("--resume")
         assert second_call_args[resume_idx + 1] == "s1"
 
 
 class TestErrorClearsSession:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_error_clears_session_for_retry(
         self, mock_run: MagicMock, mock_popen: MagicMock,
         project_dir: Path, config: WorkflowConfig,
@@ -288,144 +439,97 @@ class TestErrorClearsSession:
         call_count = [0]
 
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+            if is_claude_call(args, kwargs):
                 call_count[0] += 1
                 if call_count[0] == 1:
                     # First call: returns error with a session ID
                     return MockPopen(
-                        build_ndjson_stream(
+                        build_ndjson_bytes(
                             "err-session", 0.01, 1, "Error occurred", is_error=True
                         )
                     )
                 else:
                     # Second call: should NOT have --resume
-                    return MockPopen(build_ndjson_stream("s2", 0.01, 1, "Working..."))
-            return MockPopen("")  # taskkill
-
-        def run_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd:
-                if cmd[0] == "git":
-                    return mock_git_log_result()
-                if "council_browser" in str(cmd):
-                    return mock_playwright_result()
-            return MagicMock(returncode=0, stdout="", stderr="")
+                    return MockPopen(build_ndjson_bytes("s2", 0.01, 1, "Working..."))
+            return EMPTY_POPEN  # taskkill
 
         mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = run_side_effect
+        mock_run.side_effect = _loop_run_side_effect
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
-        # Find claude CLI calls
-        claude_calls = [
-            c for c in mock_popen.call_args_list
-            if c[0] and isinstance(c[0][0], list) and c[0][0] and c[0][0][0] == "claude"
-        ]
-        assert len(claude_calls) >= 2
+        # Find the second claude CLI call
+        second_call = nth_claude_call(mock_popen, 1)
+        assert second_call is not None
         # Second call should NOT have --resume (session cleared after error)
-        second_call_args = claude_calls[1][0][0]
+        second_call_args = second_call[0][0]
         assert "--resume" not in second_call_args
 
 
+@pytest.mark.needs_workflow_files
 class TestMetricsSummary:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_metrics_summary_written_on_complete(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+    @pytest.mark.parametrize(
+        ("ndjson", "expected_exit", "expected_summary"),
+        [
+            pytest.param(
+                _NDJSON_COMPLETE_2_TURNS, EXIT_COMPLETE,
+                {
+                    "exit_code": 0, "status": "completed", "iterations": 1,
+                    "total_cost_usd": 0.05, "total_turns": 2, "error_count": 0,
+                },
+                id="complete",
+            ),
+            pytest.param(
+                _NDJSON_OVER_BUDGET, EXIT_BUDGET_EXCEEDED,
+                {"exit_code": 2, "status": "failed"},
+                id="budget_exceeded",
+            ),
+        ],
+    )
+    def test_metrics_summary_written(
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
+        ndjson: bytes, expected_exit: int, expected_summary: dict,
     ) -> None:
-        """Metrics summary JSON is written when loop completes."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.05, 2, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        """Metrics summary JSON is written when the loop completes or fails."""
+        dispatchers(claude_ndjson=ndjson)
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
 
-        assert exit_code == EXIT_COMPLETE
+        assert exit_code == expected_exit
         summary_path = project_dir / ".workflow" / "metrics_summary.json"
         assert summary_path.exists()
 
-        summary = json.loads(summary_path.read_text(encoding="utf-8"))
-        assert summary["exit_code"] == 0
-        assert summary["status"] == "completed"
-        assert summary["iterations"] == 1
-        assert summary["total_cost_usd"] == pytest.approx(0.05)
-        assert summary["total_turns"] == 2
-        assert summary["error_count"] == 0
-
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_metrics_summary_written_on_budget_exceeded(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Metrics summary JSON is written when budget is exceeded."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 10.0, 1, "Expensive"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
-        driver = LoopDriver(project_dir, config)
-        exit_code = driver.run()
-
-        assert exit_code == EXIT_BUDGET_EXCEEDED
-        summary_path = project_dir / ".workflow" / "metrics_summary.json"
-        assert summary_path.exists()
-        summary = json.loads(summary_path.read_text(encoding="utf-8"))
-        assert summary["exit_code"] == 2
-        assert summary["status"] == "failed"
+        summary = json.loads(summary_path.read_bytes())
+        assert {k: summary[k] for k in expected_summary} == pytest.approx(expected_summary)
 
 
+@pytest.mark.needs_workflow_files
 class TestTraceLogging:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_trace_jsonl_written_on_complete(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, completed_trace: tuple[int, list[dict]],
     ) -> None:
         """After successful run, trace.jsonl contains expected event types."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.05, 2, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
-        driver = LoopDriver(project_dir, config)
-        exit_code = driver.run()
+        exit_code, events = completed_trace
         assert exit_code == EXIT_COMPLETE
 
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        assert trace_path.exists()
+        event_types = {e["event_type"] for e in events}
+        assert {
+            "loop_start",
+            "claude_invoke",
+            "claude_complete",
+            "completion_detected",
+            "loop_end",
+        } <= event_types
 
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        event_types = [e["event_type"] for e in events]
-        assert "loop_start" in event_types
-        assert "claude_invoke" in event_types
-        assert "claude_complete" in event_types
-        assert "completion_detected" in event_types
-        assert "loop_end" in event_types
-
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_trace_events_are_valid_json(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, completed_trace: tuple[int, list[dict]],
     ) -> None:
         """Each trace line is valid JSON with required fields."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
-        driver = LoopDriver(project_dir, config)
-        driver.run()
-
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        for line in trace_path.read_text(encoding="utf-8").strip().splitlines():
-            event = json.loads(line)
+        _, events = completed_trace  # _load_trace raises on any invalid line
+        assert events
+        for event in events:
             assert "timestamp" in event
             assert "event_type" in event
             assert "iteration" in event
@@ -433,191 +537,130 @@ class TestTraceLogging:
 
 class TestSmokeTestMode:
     def test_smoke_test_overrides_config(
-        self, project_dir: Path, config: WorkflowConfig,
+        self, project_template: Path, config: WorkflowConfig,
     ) -> None:
         """Smoke test mode overrides config limits."""
-        with patch("research_bridge.subprocess.run") as mock_run:
-            mock_run.return_value = mock_playwright_result()
-            driver = LoopDriver(project_dir, config, smoke_test=True, dry_run=True)
-            assert driver.config.limits.max_iterations == 1
-            assert driver.config.limits.timeout_seconds == 120
-            assert driver.config.limits.max_per_iteration_budget_usd == 2.0
-            assert driver.config.limits.max_turns_per_iteration == 10
+        driver = LoopDriver(project_template, config, smoke_test=True, dry_run=True)
+        assert driver.config.limits.max_iterations == 1
+        assert driver.config.limits.timeout_seconds == 120
+        assert driver.config.limits.max_per_iteration_budget_usd == 2.0
+        assert driver.config.limits.max_turns_per_iteration == 10
 
     def test_smoke_test_uses_safe_prompt(
-        self, project_dir: Path, config: WorkflowConfig,
+        self, project_template: Path, config: WorkflowConfig,
     ) -> None:
         """Smoke test mode uses a safe default prompt."""
-        with patch("research_bridge.subprocess.run") as mock_run:
-            mock_run.return_value = mock_playwright_result()
-            driver = LoopDriver(project_dir, config, smoke_test=True, dry_run=True)
-            assert "PROJECT_COMPLETE" in driver.initial_prompt
-            assert "Review the current project" in driver.initial_prompt
+        driver = LoopDriver(project_template, config, smoke_test=True, dry_run=True)
+        assert "PROJECT_COMPLETE" in driver.initial_prompt
+        assert "Review the current project" in driver.initial_prompt
+
+
+def _run_stagnation(
+    mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
+    project_dir: Path, config: WorkflowConfig, turns: int, cost: float,
+) -> int:
+    """Run the loop with every Claude call returning the same turns/cost."""
+    monkeypatch.setattr("subprocess.Popen", make_popen_dispatcher(
+        claude_ndjson=build_ndjson_bytes("s1", cost, turns, "Thinking..."),
+    ))
+    mock_run.side_effect = _RESEARCH_RUN_DISPATCHER
+    return LoopDriver(project_dir, config).run()
+
+
+@pytest.fixture
+def stagnation_config(config: WorkflowConfig) -> WorkflowConfig:
+    """config with a 3-iteration window, a low-turn threshold of 2 and 10 iterations."""
+    config.limits.max_iterations = 10
+    config.stagnation.window_size = 3
+    config.stagnation.low_turn_threshold = 2
+    return config
 
 
 class TestStagnationDetection:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_low_turns_triggers_stagnation_exit(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+    pytestmark = pytest.mark.integration
+
+    @pytest.mark.parametrize(
+        ("max_iterations", "enabled", "low_turn_threshold", "turns", "cost", "expected"),
+        [
+            # 3 for initial window + 1 reset + 3 more = 7 iterations needed
+            pytest.param(10, True, 2, 1, 0.01, EXIT_STAGNATION, id="low_turns"),
+            # Threshold 0 so the zero-cost check triggers, not low-turn
+            pytest.param(10, True, 0, 5, 0.0, EXIT_STAGNATION, id="zero_cost"),
+            pytest.param(5, False, 2, 1, 0.01, EXIT_MAX_ITERATIONS, id="disabled"),
+        ],
+    )
+    def test_stagnation_exit_code(
+        self, mock_run: MagicMock, max_iterations: int, enabled: bool,
+        low_turn_threshold: int, turns: int, cost: float, expected: int,
+        monkeypatch: pytest.MonkeyPatch, project_dir: Path,
+        stagnation_config: WorkflowConfig,
     ) -> None:
-        """Consecutive low-turn iterations trigger stagnation exit after session reset."""
-        # Need enough iterations: 3 for initial window + 1 reset + 3 more = 7
-        config.limits.max_iterations = 10
-        config.stagnation.window_size = 3
-        config.stagnation.low_turn_threshold = 2
+        """Low-turn and zero-cost windows exit as stagnation unless disabled."""
+        stagnation_config.limits.max_iterations = max_iterations
+        stagnation_config.stagnation.enabled = enabled
+        stagnation_config.stagnation.low_turn_threshold = low_turn_threshold
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "Thinking..."),
+        exit_code = _run_stagnation(
+            mock_run, monkeypatch, project_dir, stagnation_config, turns=turns, cost=cost,
         )
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
-
-        driver = LoopDriver(project_dir, config)
-        exit_code = driver.run()
-        assert exit_code == EXIT_STAGNATION
+        assert exit_code == expected
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    @pytest.mark.needs_workflow_files
     def test_stagnation_resets_session_first(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
+        project_dir: Path, stagnation_config: WorkflowConfig,
     ) -> None:
         """Stagnation detection resets session before giving up."""
-        config.limits.max_iterations = 10
-        config.stagnation.window_size = 3
-        config.stagnation.low_turn_threshold = 2
-
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "Thinking..."),
+        _run_stagnation(
+            mock_run, monkeypatch, project_dir, stagnation_config, turns=1, cost=0.01,
         )
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
-
-        driver = LoopDriver(project_dir, config)
-        driver.run()
 
         # Verify trace has a stagnation_reset event (first detection)
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        event_types = [e["event_type"] for e in events]
-        assert "stagnation_reset" in event_types
-        assert "stagnation_exit" in event_types
+        event_types = _load_event_types(project_dir)
+        assert {"stagnation_reset", "stagnation_exit"} <= event_types
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_productive_iteration_resets_stagnation(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
+        project_dir: Path, stagnation_config: WorkflowConfig,
     ) -> None:
         """A productive iteration (high turns) resets the stagnation flag."""
-        config.limits.max_iterations = 5
-        config.stagnation.window_size = 3
-        config.stagnation.low_turn_threshold = 2
+        stagnation_config.limits.max_iterations = 5
         call_count = [0]
 
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+            if is_claude_call(args, kwargs):
                 call_count[0] += 1
                 # Alternate: 2 low-turn, then 1 productive, then 2 low-turn
                 # Never hits window of 3 consecutive low-turn
                 turns = 1 if call_count[0] % 3 != 0 else 10
                 return MockPopen(
-                    build_ndjson_stream(f"s{call_count[0]}", 0.05, turns, "Working...")
+                    build_ndjson_bytes(f"s{call_count[0]}", 0.05, turns, "Working...")
                 )
-            return MockPopen("")  # taskkill
+            return EMPTY_POPEN  # taskkill
 
-        def run_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd:
-                if cmd[0] == "git":
-                    return mock_git_log_result()
-                if "council_browser" in str(cmd):
-                    return mock_playwright_result()
-            return MagicMock(returncode=0, stdout="", stderr="")
+        monkeypatch.setattr("subprocess.Popen", popen_side_effect)
+        mock_run.side_effect = _loop_run_side_effect
 
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = run_side_effect
-
-        driver = LoopDriver(project_dir, config)
+        driver = LoopDriver(project_dir, stagnation_config)
         exit_code = driver.run()
         # Should hit max iterations, not stagnation
         assert exit_code == EXIT_MAX_ITERATIONS
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_stagnation_disabled_by_config(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Stagnation detection can be disabled."""
-        config.limits.max_iterations = 5
-        config.stagnation.enabled = False
-        config.stagnation.window_size = 3
-        config.stagnation.low_turn_threshold = 2
-
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "Thinking..."),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
-
-        driver = LoopDriver(project_dir, config)
-        exit_code = driver.run()
-        # Should reach max iterations, not stagnation
-        assert exit_code == EXIT_MAX_ITERATIONS
-
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_zero_cost_triggers_stagnation(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """All-zero-cost iterations trigger stagnation (context exhaustion)."""
-        config.limits.max_iterations = 10
-        config.stagnation.window_size = 3
-        # Use high turn threshold so the zero-cost check triggers, not low-turn
-        config.stagnation.low_turn_threshold = 0
-
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.0, 5, "Working..."),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
-
-        driver = LoopDriver(project_dir, config)
-        exit_code = driver.run()
-        assert exit_code == EXIT_STAGNATION
-
 
 class TestConsecutiveTimeouts:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_consecutive_timeouts_exit_stagnation(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Consecutive timeouts exit with stagnation code after limit."""
         config.limits.max_iterations = 5
         config.stagnation.max_consecutive_timeouts = 2
 
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        dispatchers(claude_ndjson="", research_result=mock_playwright_result())
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
         assert exit_code == EXIT_STAGNATION
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_timeout_clears_session(
         self, mock_run: MagicMock, mock_popen: MagicMock,
         project_dir: Path, config: WorkflowConfig,
@@ -628,42 +671,27 @@ class TestConsecutiveTimeouts:
         call_count = [0]
 
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+            if is_claude_call(args, kwargs):
                 call_count[0] += 1
                 if call_count[0] == 1:
-                    return MockPopen("")  # Simulates timeout (no result event)
-                return MockPopen(build_ndjson_stream("s2", 0.05, 5, "Working..."))
-            return MockPopen("")  # taskkill
-
-        def run_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd:
-                if cmd[0] == "git":
-                    return mock_git_log_result()
-                if "council_browser" in str(cmd):
-                    return mock_playwright_result()
-            return MagicMock(returncode=0, stdout="", stderr="")
+                    return EMPTY_POPEN  # Simulates timeout (no result event)
+                return MockPopen(build_ndjson_bytes("s2", 0.05, 5, "Working..."))
+            return EMPTY_POPEN  # taskkill
 
         mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = run_side_effect
+        mock_run.side_effect = _loop_run_side_effect
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
         # After timeout, session should be cleared — second call should NOT have --resume
-        claude_calls = [
-            c for c in mock_popen.call_args_list
-            if c[0] and isinstance(c[0][0], list) and c[0][0] and c[0][0][0] == "claude"
-        ]
-        if len(claude_calls) >= 2:
-            second_call_args = claude_calls[1][0][0]
+        second_call = nth_claude_call(mock_popen, 1)
+        if second_call is not None:
+            second_call_args = second_call[0][0]
             assert "--resume" not in second_call_args
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_timeout_counter_resets_on_success(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Successful iteration resets the consecutive timeout counter."""
@@ -672,28 +700,18 @@ class TestConsecutiveTimeouts:
         call_count = [0]
 
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+            if is_claude_call(args, kwargs):
                 call_count[0] += 1
                 # Timeout on 1st, succeed on 2nd-5th
                 if call_count[0] == 1:
-                    return MockPopen("")  # Simulates timeout (no result event)
+                    return EMPTY_POPEN  # Simulates timeout (no result event)
                 return MockPopen(
-                    build_ndjson_stream(f"s{call_count[0]}", 0.05, 5, "Working...")
+                    build_ndjson_bytes(f"s{call_count[0]}", 0.05, 5, "Working...")
                 )
-            return MockPopen("")  # taskkill
+            return EMPTY_POPEN  # taskkill
 
-        def run_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd:
-                if cmd[0] == "git":
-                    return mock_git_log_result()
-                if "council_browser" in str(cmd):
-                    return mock_playwright_result()
-            return MagicMock(returncode=0, stdout="", stderr="")
-
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = run_side_effect
+        monkeypatch.setattr("subprocess.Popen", popen_side_effect)
+        mock_run.side_effect = _loop_run_side_effect
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
@@ -703,193 +721,128 @@ class TestConsecutiveTimeouts:
 
 
 class TestModelAwareTimeout:
-    @patch("loop_driver.threading.Timer")
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_opus_gets_double_timeout(
-        self, mock_run: MagicMock, mock_popen: MagicMock, mock_timer: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Opus model gets 2x the base timeout."""
-        config.limits.max_iterations = 1
-        config.limits.timeout_seconds = 600
-        config.claude.model = "opus"
-
-        mock_timer.return_value = MagicMock()  # No-op timer
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.50, 10, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
-        driver = LoopDriver(project_dir, config)
-        driver.run()
-
-        # Timer was called with (effective_timeout, callback)
-        assert mock_timer.call_args[0][0] == 1200  # 600 * 2.0
-
-    @patch("loop_driver.threading.Timer")
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_sonnet_gets_normal_timeout(
-        self, mock_run: MagicMock, mock_popen: MagicMock, mock_timer: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Sonnet model gets 1x the base timeout (no scaling)."""
-        config.limits.max_iterations = 1
-        config.limits.timeout_seconds = 600
-        config.claude.model = "sonnet"
-
-        mock_timer.return_value = MagicMock()  # No-op timer
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.50, 10, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
-        driver = LoopDriver(project_dir, config)
-        driver.run()
-
-        # Timer was called with (effective_timeout, callback)
-        assert mock_timer.call_args[0][0] == 600  # 600 * 1.0
-
-    @patch("loop_driver.threading.Timer")
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_unknown_model_gets_1x_timeout(
-        self, mock_run: MagicMock, mock_popen: MagicMock, mock_timer: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+    @pytest.mark.parametrize(
+        ("model", "timeout_seconds", "expected_timeout"),
+        [
+            pytest.param("opus", 600, 1200, id="opus_doubled"),
+            pytest.param("sonnet", 600, 600, id="sonnet_unscaled"),
+            pytest.param("custom-model", 300, 300, id="unknown_model_1x"),
+        ],
+    )
+    def test_timeout_scaled_by_model(
+        self, mock_timer: MagicMock,
+        dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
+        model: str, timeout_seconds: int, expected_timeout: int,
     ) -> None:
-        """Unknown model defaults to 1x multiplier."""
+        """Timer gets timeout_seconds times the model multiplier (1x for unknown models)."""
         config.limits.max_iterations = 1
-        config.limits.timeout_seconds = 300
-        config.claude.model = "custom-model"
+        config.limits.timeout_seconds = timeout_seconds
+        config.claude.model = model
 
-        mock_timer.return_value = MagicMock()  # No-op timer
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.10, 5, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=_NDJSON_COMPLETE_10_TURNS)
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
         # Timer was called with (effective_timeout, callback)
-        assert mock_timer.call_args[0][0] == 300  # 300 * 1.0 (default)
-
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_opus_max_turns_capped(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Opus model caps max-turns to 25 (below config default of 50)."""
-        config.limits.max_iterations = 1
-        config.limits.max_turns_per_iteration = 50
-        config.claude.model = "opus"
-
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.50, 10, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
-        driver = LoopDriver(project_dir, config)
-        driver.run()
-
-        claude_calls = [
-            c for c in mock_popen.call_args_list
-            if c[0] and isinstance(c[0][0], list) and c[0][0] and c[0][0][0] == "claude"
-        ]
-        assert len(claude_calls) >= 1
-        args = claude_calls[0][0][0]
-        turns_idx = args.index("--max-turns")
-        assert args[turns_idx + 1] == "25"
-
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_sonnet_max_turns_default(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        assert mock_timer.call_args[0][0] == expected_timeout
+
+    @pytest.mark.parametrize(
+        ("model", "expected_turns"),
+        [
+            ("opus", "25"),  # Capped below config default of 50
+            ("sonnet", "50"),  # Full config max-turns (no override)
+        ],
+    )
+    def test_max_turns_for_model(
+        self, mock_run: MagicMock, model: str, expected_turns: str,
+        monkeypatch: pytest.MonkeyPatch, project_dir: Path, config: WorkflowConfig,
     ) -> None:
-        """Sonnet model uses full config max-turns (no override)."""
+        """--max-turns honours the per-model cap over max_turns_per_iteration."""
         config.limits.max_iterations = 1
         config.limits.max_turns_per_iteration = 50
-        config.claude.model = "sonnet"
+        config.claude.model = model
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.50, 10, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        claude_calls: list[list[str]] = []
+        monkeypatch.setattr("subprocess.Popen", make_popen_dispatcher(
+            claude_ndjson=_NDJSON_COMPLETE_10_TURNS,
+            claude_calls=claude_calls,
+        ))
+        mock_run.side_effect = _DEFAULT_RUN_DISPATCHER
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
-        claude_calls = [
-            c for c in mock_popen.call_args_list
-            if c[0] and isinstance(c[0][0], list) and c[0][0] and c[0][0][0] == "claude"
-        ]
-        assert len(claude_calls) >= 1
-        args = claude_calls[0][0][0]
+        assert claude_calls
+        args = claude_calls[0]
         turns_idx = args.index("--max-turns")
-        assert args[turns_idx + 1] == "50"
-
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_opus_three_timeouts_before_stagnation(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        assert args[turns_idx + 1] == expected_turns
+
+    @pytest.mark.parametrize(
+        ("model", "expected_consecutive_timeouts", "model_fallback"),
+        [
+            # Opus override defaults to 3; fallback (Opus -> Sonnet at 2
+            # timeouts) is disabled to test the raw Opus limit.
+            ("opus", 3, {}),
+            # Sonnet still uses the base limit of 2
+            ("sonnet", 2, None),
+        ],
+    )
+    def test_consecutive_timeouts_before_stagnation(
+        self, model: str, expected_consecutive_timeouts: int,
+        model_fallback: dict | None,
+        dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
-        """Opus needs 3 consecutive timeouts before stagnation exit (not 2).
-
-        With model fallback enabled (default), Opus falls back to Sonnet at 2 timeouts,
-        so we disable fallback here to test the raw Opus timeout limit.
-        """
+        """Stagnation exit waits for the model's consecutive-timeout limit."""
         config.limits.max_iterations = 5
-        config.claude.model = "opus"
+        config.claude.model = model
         config.stagnation.max_consecutive_timeouts = 2  # base: 2
-        config.limits.model_fallback = {}  # Disable fallback to test raw Opus limit
-        # opus override defaults to 3
+        if model_fallback is not None:
+            config.limits.model_fallback = model_fallback
 
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        dispatchers(claude_ndjson="", research_result=mock_playwright_result())
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
         assert exit_code == EXIT_STAGNATION
-        assert driver._consecutive_timeouts == 3  # Not 2
+        assert driver._consecutive_timeouts == expected_consecutive_timeouts
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
-    def test_sonnet_two_timeouts_triggers_stagnation(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Sonnet still uses default of 2 consecutive timeouts for stagnation."""
-        config.limits.max_iterations = 5
-        config.claude.model = "sonnet"
-        config.stagnation.max_consecutive_timeouts = 2
 
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+@pytest.fixture(scope="class")
+def completed_trace(
+    project_template: Path, tmp_path_factory: pytest.TempPathFactory,
+) -> tuple[int, list[dict]]:
+    """Run one completing loop per class and return (exit_code, parsed trace events).
 
-        driver = LoopDriver(project_dir, config)
-        exit_code = driver.run()
-        assert exit_code == EXIT_STAGNATION
-        assert driver._consecutive_timeouts == 2
+    Function-scoped autouse patches are not active yet at class scope, so the
+    subprocess mocks and _install_workflow_stubs are applied here for the run
+    only, keeping real trace writes as needs_workflow_files does.
+    """
+    project = Path(shutil.copytree(project_template, tmp_path_factory.mktemp("trace") / "p"))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("subprocess.Popen", _popen_dispatcher(_NDJSON_COMPLETE_2_TURNS))
+        mp.setattr("subprocess.run", _DEFAULT_RUN_DISPATCHER)
+        _install_workflow_stubs(mp, workflow_writes=False)
+        exit_code = LoopDriver(project, _make_config()).run()
+    return exit_code, _load_trace(project / ".workflow" / "trace.jsonl")
+
+
+@pytest.fixture(scope="module")
+def json_formatter() -> JsonFormatter:
+    return JsonFormatter(datefmt="%Y-%m-%d %H:%M:%S")
+
+
+_SAMPLE_RECORD = logging.makeLogRecord({
+    "name": "test", "levelno": logging.INFO, "levelname": "INFO",
+    "msg": "Test message with data: %s", "args": ("value",),
+    "pathname": "", "lineno": 0,
+})
 
 
 class TestJsonFormatter:
-    def test_json_log_format_produces_valid_json(self) -> None:
+    def test_json_log_format_produces_valid_json(self, json_formatter: JsonFormatter) -> None:
         """JsonFormatter produces valid JSON output."""
-        formatter = JsonFormatter(datefmt="%Y-%m-%d %H:%M:%S")
-        record = logging.LogRecord(
-            name="test", level=logging.INFO, pathname="", lineno=0,
-            msg="Test message with data: %s", args=("value",),
-            exc_info=None,
-        )
-        output = formatter.format(record)
+        output = json_formatter.format(_SAMPLE_RECORD)
         parsed = json.loads(output)
 
         assert parsed["level"] == "INFO"
@@ -899,11 +852,16 @@ class TestJsonFormatter:
 
 
 class TestTimeoutCooldown:
-    @patch("loop_driver.time.sleep")
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    pytestmark = pytest.mark.integration
+
+    @pytest.fixture(autouse=True)
+    def _record_sleeps(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Record cooldown sleeps in self.sleep_log instead of sleeping."""
+        self.sleep_log: list[float] = []
+        monkeypatch.setattr("loop_driver.time.sleep", self.sleep_log.append)
+
     def test_cooldown_applied_after_timeout(
-        self, mock_run: MagicMock, mock_popen: MagicMock, mock_sleep: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """After first timeout, loop sleeps for cooldown before retry."""
@@ -914,32 +872,24 @@ class TestTimeoutCooldown:
         call_count = [0]
 
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+            if is_claude_call(args, kwargs):
                 call_count[0] += 1
                 if call_count[0] == 1:
-                    return MockPopen("")  # Timeout
-                return MockPopen(build_ndjson_stream("s2", 0.05, 5, "PROJECT_COMPLETE"))
-            return MockPopen("")
+                    return EMPTY_POPEN  # Timeout
+                return MockPopen(build_ndjson_bytes("s2", 0.05, 5, "PROJECT_COMPLETE"))
+            return EMPTY_POPEN
 
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        monkeypatch.setattr("subprocess.Popen", popen_side_effect)
+        mock_run.side_effect = _RESEARCH_RUN_DISPATCHER
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
         # Verify sleep was called with base cooldown (60s for first timeout)
-        sleep_calls = [c[0][0] for c in mock_sleep.call_args_list]
-        assert 60 in sleep_calls
+        assert 60 in self.sleep_log
 
-    @patch("loop_driver.time.sleep")
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_cooldown_escalates(
-        self, mock_run: MagicMock, mock_popen: MagicMock, mock_sleep: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Consecutive timeouts increase cooldown (60, 120)."""
         config.limits.max_iterations = 5
@@ -948,24 +898,16 @@ class TestTimeoutCooldown:
         config.stagnation.max_consecutive_timeouts = 4
         config.limits.model_fallback = {}  # Disable fallback
 
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        dispatchers(claude_ndjson="", research_result=mock_playwright_result())
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
-        sleep_calls = [c[0][0] for c in mock_sleep.call_args_list]
-        assert 60 in sleep_calls   # First timeout
-        assert 120 in sleep_calls  # Second timeout
+        assert 60 in self.sleep_log   # First timeout
+        assert 120 in self.sleep_log  # Second timeout
 
-    @patch("loop_driver.time.sleep")
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_cooldown_capped_at_max(
-        self, mock_run: MagicMock, mock_popen: MagicMock, mock_sleep: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Cooldown doesn't exceed max configured value."""
         config.limits.max_iterations = 10
@@ -974,72 +916,59 @@ class TestTimeoutCooldown:
         config.stagnation.max_consecutive_timeouts = 5
         config.limits.model_fallback = {}  # Disable fallback
 
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        dispatchers(claude_ndjson="", research_result=mock_playwright_result())
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
-        sleep_calls = [c[0][0] for c in mock_sleep.call_args_list]
         # All cooldowns should be <= max
-        for val in sleep_calls:
+        for val in self.sleep_log:
             assert val <= 200
 
 
+@pytest.mark.preflight
 class TestPreflightCheck:
-    @patch("subprocess.run")
     def test_preflight_passes(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
+        self, mock_run: MagicMock, project_template: Path, config: WorkflowConfig,
     ) -> None:
         """Preflight passes when claude --version succeeds."""
-        mock_run.return_value = MagicMock(returncode=0, stdout="claude 1.0.0\n", stderr="")
-        driver = LoopDriver(project_dir, config, dry_run=True)
+        mock_run.return_value = CLAUDE_VERSION_RESULT
+        driver = LoopDriver(project_template, config, dry_run=True)
         assert driver._preflight_check() is True
 
-    @patch("subprocess.run")
     def test_preflight_fails_missing_cli(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
+        self, mock_run: MagicMock, project_template: Path, config: WorkflowConfig,
     ) -> None:
         """Preflight fails when claude is not on PATH."""
         mock_run.side_effect = FileNotFoundError("claude not found")
-        driver = LoopDriver(project_dir, config, dry_run=True)
+        driver = LoopDriver(project_template, config, dry_run=True)
         assert driver._preflight_check() is False
 
-    @patch("subprocess.run")
     def test_preflight_fails_timeout(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
+        self, mock_run: MagicMock, project_template: Path, config: WorkflowConfig,
     ) -> None:
         """Preflight fails when claude --version times out."""
         mock_run.side_effect = sp.TimeoutExpired(cmd="claude", timeout=30)
-        driver = LoopDriver(project_dir, config, dry_run=True)
+        driver = LoopDriver(project_template, config, dry_run=True)
         assert driver._preflight_check() is False
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_preflight_failure_exits_stagnation(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Preflight failure exits with EXIT_STAGNATION before any iteration."""
         mock_run.side_effect = FileNotFoundError("claude not found")
+        monkeypatch.setattr("subprocess.Popen", _popen_dispatcher())
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
         assert exit_code == EXIT_STAGNATION
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_skip_preflight_flag(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """--skip-preflight bypasses the preflight check."""
         config.limits.max_iterations = 1
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=_NDJSON_COMPLETE)
 
         driver = LoopDriver(project_dir, config, skip_preflight=True)
         exit_code = driver.run()
@@ -1047,200 +976,160 @@ class TestPreflightCheck:
 
 
 class TestDiagnosticCapture:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_timeout_trace_includes_event_count(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
+        trace_events: list[dict],
     ) -> None:
         """Timeout trace event includes ndjson_events_received count."""
         config.limits.max_iterations = 2
         config.stagnation.max_consecutive_timeouts = 2
 
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        dispatchers(claude_ndjson="", research_result=mock_playwright_result())
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        timeout_events = [e for e in events if e["event_type"] == "timeout_detected"]
+        timeout_events = [e for e in trace_events if e["event_type"] == "timeout_detected"]
         assert len(timeout_events) >= 1
         assert "ndjson_events_received" in timeout_events[0]
         assert timeout_events[0]["ndjson_events_received"] == 0
         assert "had_session_id" in timeout_events[0]
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_zero_events_logs_warning(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig, caplog,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig, caplog,
     ) -> None:
         """Zero events on timeout produces specific warning."""
         config.limits.max_iterations = 1
         config.stagnation.max_consecutive_timeouts = 2
 
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        dispatchers(claude_ndjson="", research_result=mock_playwright_result())
 
         driver = LoopDriver(project_dir, config)
         with caplog.at_level(logging.WARNING):
             driver.run()
 
-        assert any("ZERO events" in r.message for r in caplog.records)
+        assert "ZERO events" in _caplog_text(caplog)
+
+
+@pytest.fixture(scope="class")
+def opus_timeout_run(
+    project_template: Path, tmp_path_factory: pytest.TempPathFactory,
+) -> tuple[int, list[dict]]:
+    """Run one all-timeout Opus loop per class and return (exit_code, trace events).
+
+    Every claude call times out, so Opus falls back to Sonnet and the loop
+    ends in stagnation. As in completed_trace, the stubs are applied here for
+    the run only, with trace events captured in memory.
+    """
+    project = Path(shutil.copytree(project_template, tmp_path_factory.mktemp("timeouts") / "p"))
+    config = _make_config()
+    config.limits.max_iterations = 10
+    config.claude.model = "opus"
+    config.stagnation.max_consecutive_timeouts = 2
+
+    events: list[dict] = []
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("subprocess.Popen", _popen_dispatcher(""))
+        mp.setattr("subprocess.run", _RESEARCH_RUN_DISPATCHER)
+        _install_workflow_stubs(mp)
+        mp.setattr(LoopDriver, "_write_trace_event", _trace_capture(events))
+        exit_code = LoopDriver(project, config).run()
+    return exit_code, events
 
 
 class TestModelFallback:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    pytestmark = pytest.mark.integration
+
     def test_opus_falls_back_to_sonnet_after_2_timeouts(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
+        trace_events: list[dict],
     ) -> None:
         """After 2 Opus timeouts, model switches to Sonnet."""
         config.limits.max_iterations = 5
         config.claude.model = "opus"
         config.stagnation.max_consecutive_timeouts = 2
-        call_count = [0]
 
-        def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
-                call_count[0] += 1
-                if call_count[0] <= 2:
-                    return MockPopen("")  # Timeout (Opus)
-                # Sonnet succeeds
-                return MockPopen(
-                    build_ndjson_stream(f"s{call_count[0]}", 0.05, 5, "PROJECT_COMPLETE")
-                )
-            return MockPopen("")
-
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        models = _fake_invoke_claude(monkeypatch, [
+            ParsedStream(),  # Timeout (Opus)
+            ParsedStream(),  # Timeout (Opus)
+            build_parsed_stream("s3", 0.05, 5, "PROJECT_COMPLETE"),  # Sonnet succeeds
+        ])
+        mock_run.side_effect = _RESEARCH_RUN_DISPATCHER
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
         assert exit_code == EXIT_COMPLETE
+        assert models == ["opus", "opus", "sonnet"]
 
         # Verify model was switched
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        fallback_events = [e for e in events if e["event_type"] == "model_fallback"]
+        fallback_events = [e for e in trace_events if e["event_type"] == "model_fallback"]
         assert len(fallback_events) == 1
         assert fallback_events[0]["from_model"] == "opus"
         assert fallback_events[0]["to_model"] == "sonnet"
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_fallback_reverts_on_success(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
+        trace_events: list[dict],
     ) -> None:
         """After Sonnet succeeds productively, model reverts to Opus."""
         config.limits.max_iterations = 5
         config.claude.model = "opus"
         config.stagnation.max_consecutive_timeouts = 2
         config.stagnation.low_turn_threshold = 2
-        call_count = [0]
-
-        def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
-                call_count[0] += 1
-                if call_count[0] <= 2:
-                    return MockPopen("")  # Timeout (Opus)
-                # Sonnet succeeds with productive iteration (turns > threshold)
-                return MockPopen(
-                    build_ndjson_stream(f"s{call_count[0]}", 0.05, 10, "Working...")
-                )
-            return MockPopen("")
 
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        models = _fake_invoke_claude(monkeypatch, [
+            ParsedStream(),  # Timeout (Opus)
+            ParsedStream(),  # Timeout (Opus)
+            # Sonnet succeeds with productive iterations (turns > threshold)
+            *(build_parsed_stream(f"s{i}", 0.05, 10, "Working...") for i in range(3, 6)),
+        ])
+        mock_run.side_effect = _RESEARCH_RUN_DISPATCHER
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
+        assert models[:4] == ["opus", "opus", "sonnet", "opus"]
+
         # Verify model reverted
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        revert_events = [e for e in events if e["event_type"] == "model_fallback_revert"]
+        revert_events = [e for e in trace_events if e["event_type"] == "model_fallback_revert"]
         assert len(revert_events) >= 1
         assert revert_events[0]["from_model"] == "sonnet"
         assert revert_events[0]["to_model"] == "opus"
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_fallback_model_stagnates_exits(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, opus_timeout_run: tuple[int, list[dict]],
     ) -> None:
         """If fallback model also times out, stagnation exit still works."""
-        config.limits.max_iterations = 10
-        config.claude.model = "opus"
-        config.stagnation.max_consecutive_timeouts = 2
-
         # All timeouts — Opus falls back to Sonnet, Sonnet also times out
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
-
-        driver = LoopDriver(project_dir, config)
-        exit_code = driver.run()
+        exit_code, _ = opus_timeout_run
         assert exit_code == EXIT_STAGNATION
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_no_fallback_when_already_using_fallback(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, opus_timeout_run: tuple[int, list[dict]],
     ) -> None:
         """Fallback only triggers once — no cascading fallbacks."""
-        config.limits.max_iterations = 10
-        config.claude.model = "opus"
-        config.stagnation.max_consecutive_timeouts = 2
-
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
-
-        driver = LoopDriver(project_dir, config)
-        driver.run()
+        _, trace_events = opus_timeout_run
 
         # Should have exactly 1 fallback event (opus→sonnet), not opus→sonnet→?
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        fallback_events = [e for e in events if e["event_type"] == "model_fallback"]
+        fallback_events = [e for e in trace_events if e["event_type"] == "model_fallback"]
         assert len(fallback_events) == 1
 
 
 class TestSessionRotation:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    @pytest.mark.integration
     def test_session_rotation_at_turn_limit(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
+        trace_events: list[dict],
     ) -> None:
         """Session rotates when cumulative turns reach the limit."""
         config.limits.max_iterations = 3
         config.stagnation.session_max_turns = 20  # Low limit for testing
         config.stagnation.session_max_cost_usd = 999.0  # Won't trigger
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 15, "Working..."),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=build_ndjson_bytes("s1", 0.01, 15, "Working..."),
             research_result=mock_playwright_result(),
         )
 
@@ -1249,17 +1138,14 @@ class TestSessionRotation:
         assert exit_code == EXIT_MAX_ITERATIONS
 
         # Verify rotation trace event
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        rotation_events = [e for e in events if e["event_type"] == "session_rotation"]
+        rotation_events = [e for e in trace_events if e["event_type"] == "session_rotation"]
         assert len(rotation_events) >= 1
         assert "turn limit" in rotation_events[0]["reason"].lower()
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    @pytest.mark.integration
     def test_session_rotation_at_cost_limit(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
+        trace_events: list[dict],
     ) -> None:
         """Session rotates when cumulative cost reaches the limit."""
         config.limits.max_iterations = 3
@@ -1268,10 +1154,8 @@ class TestSessionRotation:
         config.stagnation.session_max_turns = 9999  # Won't trigger
         config.stagnation.session_max_cost_usd = 1.0  # Low limit for testing
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.80, 10, "Working..."),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=build_ndjson_bytes("s1", 0.80, 10, "Working..."),
             research_result=mock_playwright_result(),
         )
 
@@ -1280,17 +1164,15 @@ class TestSessionRotation:
         assert exit_code == EXIT_MAX_ITERATIONS
 
         # Verify rotation trace event
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        rotation_events = [e for e in events if e["event_type"] == "session_rotation"]
+        rotation_events = [e for e in trace_events if e["event_type"] == "session_rotation"]
         assert len(rotation_events) >= 1
         assert "cost limit" in rotation_events[0]["reason"].lower()
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    @pytest.mark.integration
     def test_context_exhaustion_triggers_rotation(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
+        trace_events: list[dict],
     ) -> None:
         """Behavioral detection: 2/3 low-turn iterations trigger rotation."""
         config.limits.max_iterations = 5
@@ -1301,36 +1183,27 @@ class TestSessionRotation:
         # Disable regular stagnation so it doesn't interfere
         config.stagnation.low_turn_threshold = 0
 
-        call_count = [0]
-
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
-                call_count[0] += 1
+            if is_claude_call(args, kwargs):
                 # All iterations with 3 turns (below threshold of 5)
                 return MockPopen(
-                    build_ndjson_stream(f"s1", 0.05, 3, "Working...")
+                    build_ndjson_bytes("s1", 0.05, 3, "Working...")
                 )
-            return MockPopen("")  # taskkill
+            return EMPTY_POPEN  # taskkill
 
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        monkeypatch.setattr("subprocess.Popen", popen_side_effect)
+        mock_run.side_effect = _RESEARCH_RUN_DISPATCHER
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
         assert exit_code == EXIT_MAX_ITERATIONS
 
         # Verify rotation trace event
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        rotation_events = [e for e in events if e["event_type"] == "session_rotation"]
+        rotation_events = [e for e in trace_events if e["event_type"] == "session_rotation"]
         assert len(rotation_events) >= 1
         assert "context exhaustion" in rotation_events[0]["reason"].lower()
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    @pytest.mark.integration
     def test_rotation_continues_loop(
         self, mock_run: MagicMock, mock_popen: MagicMock,
         project_dir: Path, config: WorkflowConfig,
@@ -1343,40 +1216,25 @@ class TestSessionRotation:
         call_count = [0]
 
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+            if is_claude_call(args, kwargs):
                 call_count[0] += 1
                 sid = f"s{call_count[0]}"
-                return MockPopen(build_ndjson_stream(sid, 0.05, 15, "Working..."))
-            return MockPopen("")
-
-        def run_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd:
-                if cmd[0] == "git":
-                    return mock_git_log_result()
-                if "council_browser" in str(cmd):
-                    return mock_playwright_result()
-            return MagicMock(returncode=0, stdout="", stderr="")
+                return MockPopen(build_ndjson_bytes(sid, 0.05, 15, "Working..."))
+            return EMPTY_POPEN
 
         mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = run_side_effect
+        mock_run.side_effect = _loop_run_side_effect
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
         # Should hit max iterations, NOT stagnation
         assert exit_code == EXIT_MAX_ITERATIONS
         # Multiple Claude calls means loop continued
-        claude_calls = [
-            c for c in mock_popen.call_args_list
-            if c[0] and isinstance(c[0][0], list) and c[0][0] and c[0][0][0] == "claude"
-        ]
-        assert len(claude_calls) == 4
+        assert sum(1 for _ in claude_popen_calls(mock_popen)) == 4
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    @pytest.mark.integration
     def test_rotation_does_not_set_stagnation_flag(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Session rotation doesn't count as a stagnation strike."""
@@ -1387,107 +1245,75 @@ class TestSessionRotation:
         call_count = [0]
 
         def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
+            if is_claude_call(args, kwargs):
                 call_count[0] += 1
                 sid = f"s{call_count[0]}"
-                return MockPopen(build_ndjson_stream(sid, 0.05, 15, "Working..."))
-            return MockPopen("")
+                return MockPopen(build_ndjson_bytes(sid, 0.05, 15, "Working..."))
+            return EMPTY_POPEN
 
-        def run_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd:
-                if cmd[0] == "git":
-                    return mock_git_log_result()
-                if "council_browser" in str(cmd):
-                    return mock_playwright_result()
-            return MagicMock(returncode=0, stdout="", stderr="")
-
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = run_side_effect
-
-        driver = LoopDriver(project_dir, config)
-        driver.run()
-
-        # Rotation should NOT have set the stagnation reset flag
-        assert driver._stagnation_reset_done is False
-
-    def test_should_rotate_disabled(
-        self, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Rotation returns False when stagnation is disabled."""
-        config.stagnation.enabled = False
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        should, reason = driver._should_rotate_session("s1")
-        assert should is False
-
-    def test_should_rotate_no_session(
-        self, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Rotation returns False when session_id is None."""
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        should, reason = driver._should_rotate_session(None)
-        assert should is False
+        monkeypatch.setattr("subprocess.Popen", popen_side_effect)
+        mock_run.side_effect = _loop_run_side_effect
 
+        driver = LoopDriver(project_dir, config)
+        driver.run()
 
-class TestComputeCooldown:
-    def test_first_timeout_returns_base(
-        self, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """First timeout returns the base cooldown value."""
-        config.limits.timeout_cooldown_base_seconds = 60
-        config.limits.timeout_cooldown_max_seconds = 300
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        assert driver._compute_cooldown(1) == 60
+        # Rotation should NOT have set the stagnation reset flag
+        assert driver._stagnation_reset_done is False
 
-    def test_second_timeout_doubles(
-        self, project_dir: Path, config: WorkflowConfig,
+    @pytest.mark.parametrize(
+        ("disable_stagnation", "session_id", "expected"),
+        [
+            pytest.param(True, "s1", False, id="disabled"),
+            pytest.param(False, None, False, id="no_session"),
+        ],
+    )
+    def test_should_rotate(
+        self, shared_driver: LoopDriver, disable_stagnation: bool,
+        session_id: str | None, expected: bool, monkeypatch: pytest.MonkeyPatch,
     ) -> None:
-        """Second timeout doubles the base."""
-        config.limits.timeout_cooldown_base_seconds = 60
-        config.limits.timeout_cooldown_max_seconds = 300
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        assert driver._compute_cooldown(2) == 120
+        """No rotation when stagnation is disabled or there is no session."""
+        monkeypatch.setattr(shared_driver.config.stagnation, "enabled", not disable_stagnation)
+        should, reason = shared_driver._should_rotate_session(session_id)
+        assert should is expected
 
-    def test_capped_at_max(
-        self, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Cooldown capped at max."""
-        config.limits.timeout_cooldown_base_seconds = 60
-        config.limits.timeout_cooldown_max_seconds = 300
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        assert driver._compute_cooldown(10) == 300
 
-    def test_zero_base_returns_zero(
-        self, project_dir: Path, config: WorkflowConfig,
+class TestComputeCooldown:
+    @pytest.mark.parametrize(
+        ("base", "max_s", "n", "expected"),
+        [
+            pytest.param(60, 300, 1, 60, id="first_timeout_returns_base"),
+            pytest.param(60, 300, 2, 120, id="second_timeout_doubles"),
+            pytest.param(60, 300, 10, 300, id="capped_at_max"),
+            pytest.param(0, 300, 5, 0, id="zero_base_returns_zero"),
+        ],
+    )
+    def test_compute_cooldown(
+        self, shared_driver: LoopDriver, base: int, max_s: int, n: int, expected: int,
+        monkeypatch: pytest.MonkeyPatch,
     ) -> None:
-        """Base of 0 disables cooldown."""
-        config.limits.timeout_cooldown_base_seconds = 0
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        assert driver._compute_cooldown(5) == 0
+        """Exponential backoff from the base, capped at max; base 0 disables it."""
+        limits = shared_driver.config.limits
+        monkeypatch.setattr(limits, "timeout_cooldown_base_seconds", base)
+        monkeypatch.setattr(limits, "timeout_cooldown_max_seconds", max_s)
+        assert shared_driver._compute_cooldown(n) == expected
 
 
+@pytest.mark.needs_workflow_files
 class TestTraceLogRotation:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    """Rotation happens in _write_trace_event, so one event exercises it without run()."""
+
     def test_trace_rotates_when_over_limit(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """trace.jsonl rotates to .jsonl.1 when exceeding configured size."""
         trace_path = project_dir / ".workflow" / "trace.jsonl"
         trace_path.parent.mkdir(parents=True, exist_ok=True)
         # Write enough data to exceed limit
-        trace_path.write_text("x" * 500, encoding="utf-8")
+        trace_path.write_bytes(b"x" * 500)
         config.limits.trace_max_size_bytes = 100  # Very low limit
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
         driver = LoopDriver(project_dir, config)
-        driver.run()
+        driver._write_trace_event("loop_start")
 
         rotated = trace_path.with_suffix(".jsonl.1")
         assert rotated.exists()
@@ -1495,116 +1321,93 @@ class TestTraceLogRotation:
         assert trace_path.exists()
         assert trace_path.stat().st_size < 500  # Smaller than original
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_trace_rotation_replaces_existing_backup(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Rotation replaces existing .jsonl.1 file."""
         trace_path = project_dir / ".workflow" / "trace.jsonl"
         trace_path.parent.mkdir(parents=True, exist_ok=True)
-        trace_path.write_text("new_data_" * 100, encoding="utf-8")
+        trace_path.write_bytes(b"new_data_" * 100)
         rotated = trace_path.with_suffix(".jsonl.1")
-        rotated.write_text("old_backup", encoding="utf-8")
+        rotated.write_bytes(b"old_backup")
         config.limits.trace_max_size_bytes = 100
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
         driver = LoopDriver(project_dir, config)
-        driver.run()
+        driver._write_trace_event("loop_start")
 
         assert rotated.exists()
-        assert "old_backup" not in rotated.read_text(encoding="utf-8")
+        assert b"old_backup" not in rotated.read_bytes()
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_trace_no_rotation_when_zero(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """trace_max_size_bytes=0 disables rotation."""
         trace_path = project_dir / ".workflow" / "trace.jsonl"
         trace_path.parent.mkdir(parents=True, exist_ok=True)
-        trace_path.write_text("x" * 500, encoding="utf-8")
+        trace_path.write_bytes(b"x" * 500)
         config.limits.trace_max_size_bytes = 0
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
-
         driver = LoopDriver(project_dir, config)
-        driver.run()
+        driver._write_trace_event("loop_start")
 
         rotated = trace_path.with_suffix(".jsonl.1")
         assert not rotated.exists()
 
 
+@pytest.mark.preflight
 class TestExtendedPreflightChecks:
-    @patch("subprocess.run")
+    @pytest.fixture(autouse=True)
+    def _capture_warnings(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Capture WARNING and above for every test in the class."""
+        caplog.set_level(logging.WARNING)
+
     def test_preflight_warns_missing_claude_md(
         self, mock_run: MagicMock, tmp_path: Path, config: WorkflowConfig, caplog,
     ) -> None:
         """Preflight warns when CLAUDE.md is missing."""
         (tmp_path / ".workflow").mkdir()
-        mock_run.return_value = MagicMock(returncode=0, stdout="claude 1.0.0\n", stderr="")
+        mock_run.return_value = CLAUDE_VERSION_RESULT
 
         driver = LoopDriver(tmp_path, config, dry_run=True)
-        with caplog.at_level(logging.WARNING):
-            result = driver._preflight_check()
+        result = driver._preflight_check()
 
         assert result is True
-        assert any("No CLAUDE.md" in r.message for r in caplog.records)
+        assert "No CLAUDE.md" in _caplog_text(caplog)
 
-    @patch("subprocess.run")
     def test_preflight_warns_not_git_repo(
-        self, mock_run: MagicMock, tmp_path: Path, config: WorkflowConfig, caplog,
+        self, mock_run: MagicMock, project_template: Path, config: WorkflowConfig, caplog,
     ) -> None:
         """Preflight warns when .git/ doesn't exist."""
-        (tmp_path / ".workflow").mkdir()
-        (tmp_path / "CLAUDE.md").write_text("# Project", encoding="utf-8")
-        mock_run.return_value = MagicMock(returncode=0, stdout="claude 1.0.0\n", stderr="")
+        mock_run.return_value = CLAUDE_VERSION_RESULT
 
-        driver = LoopDriver(tmp_path, config, dry_run=True)
-        with caplog.at_level(logging.WARNING):
-            driver._preflight_check()
+        driver = LoopDriver(project_template, config, dry_run=True)
+        driver._preflight_check()
 
-        assert any("Not a git repo" in r.message for r in caplog.records)
+        assert "Not a git repo" in _caplog_text(caplog)
 
-    @patch("subprocess.run")
     def test_preflight_no_warnings_when_all_present(
-        self, mock_run: MagicMock, tmp_path: Path, config: WorkflowConfig, caplog,
+        self, mock_run: MagicMock, git_project_template: Path, config: WorkflowConfig, caplog,
     ) -> None:
         """Preflight logs no warnings when all checks pass."""
-        (tmp_path / ".workflow").mkdir()
-        (tmp_path / "CLAUDE.md").write_text("# Project", encoding="utf-8")
-        (tmp_path / ".git").mkdir()
-        mock_run.return_value = MagicMock(returncode=0, stdout="claude 1.0.0\n", stderr="")
+        mock_run.return_value = CLAUDE_VERSION_RESULT
 
-        driver = LoopDriver(tmp_path, config, dry_run=True)
-        with caplog.at_level(logging.WARNING):
-            result = driver._preflight_check()
+        driver = LoopDriver(git_project_template, config, dry_run=True)
+        result = driver._preflight_check()
 
         assert result is True
-        preflight_warnings = [r for r in caplog.records if "Preflight:" in r.message]
         # May have Perplexity session warning, but no CLAUDE.md or git warnings
-        no_project_warnings = [
-            r for r in preflight_warnings
-            if "CLAUDE.md" in r.message or "git repo" in r.message
+        project_warnings = [
+            m for m in (r.message for r in caplog.records)
+            if "Preflight:" in m and ("CLAUDE.md" in m or "git repo" in m)
         ]
-        assert len(no_project_warnings) == 0
+        assert project_warnings == []
 
-    @patch("subprocess.run")
     def test_preflight_creates_workflow_dir(
         self, mock_run: MagicMock, tmp_path: Path, config: WorkflowConfig,
     ) -> None:
         """Preflight creates .workflow/ directory if it doesn't exist."""
-        (tmp_path / "CLAUDE.md").write_text("# Project", encoding="utf-8")
-        mock_run.return_value = MagicMock(returncode=0, stdout="claude 1.0.0\n", stderr="")
+        (tmp_path / "CLAUDE.md").write_bytes(b"# Project")
+        mock_run.return_value = CLAUDE_VERSION_RESULT
 
         driver = LoopDriver(tmp_path, config, dry_run=True)
         result = driver._preflight_check()
@@ -1613,25 +1416,20 @@ class TestExtendedPreflightChecks:
         assert (tmp_path / ".workflow").exists()
 
 
+@pytest.mark.needs_workflow_files
 class TestModelAnalyticsInMetrics:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_metrics_summary_includes_model_analytics(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Metrics summary JSON includes per-model analytics."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.05, 2, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=_NDJSON_COMPLETE_2_TURNS)
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
         assert exit_code == EXIT_COMPLETE
 
         summary_path = project_dir / ".workflow" / "metrics_summary.json"
-        summary = json.loads(summary_path.read_text(encoding="utf-8"))
+        summary = json.loads(summary_path.read_bytes())
         assert "model_analytics" in summary
         assert "sonnet" in summary["model_analytics"]  # default model
         sonnet_stats = summary["model_analytics"]["sonnet"]
@@ -1639,39 +1437,28 @@ class TestModelAnalyticsInMetrics:
         assert sonnet_stats["avg_turns"] == 2.0
         assert sonnet_stats["avg_cost_usd"] == pytest.approx(0.05)
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_model_analytics_with_fallback(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Model analytics separates opus and sonnet cycles after fallback."""
         config.limits.max_iterations = 5
         config.claude.model = "opus"
         config.stagnation.max_consecutive_timeouts = 2
-        call_count = [0]
-
-        def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
-                call_count[0] += 1
-                if call_count[0] <= 2:
-                    return MockPopen("")  # Timeout (Opus)
-                return MockPopen(
-                    build_ndjson_stream(f"s{call_count[0]}", 0.05, 5, "PROJECT_COMPLETE")
-                )
-            return MockPopen("")
 
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        models = _fake_invoke_claude(monkeypatch, [
+            ParsedStream(),  # Timeout (Opus)
+            ParsedStream(),  # Timeout (Opus)
+            build_parsed_stream("s3", 0.05, 5, "PROJECT_COMPLETE"),
+        ])
+        mock_run.side_effect = _RESEARCH_RUN_DISPATCHER
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
+        assert models == ["opus", "opus", "sonnet"]
         summary_path = project_dir / ".workflow" / "metrics_summary.json"
-        summary = json.loads(summary_path.read_text(encoding="utf-8"))
+        summary = json.loads(summary_path.read_bytes())
         analytics = summary["model_analytics"]
         # Opus had 2 timeout iterations, sonnet had 1 successful
         assert "opus" in analytics
@@ -1680,110 +1467,84 @@ class TestModelAnalyticsInMetrics:
         assert analytics["sonnet"]["iterations"] >= 1
 
 
+@pytest.mark.needs_workflow_files
 class TestImprovedErrorMessages:
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
+    @pytest.fixture(autouse=True)
+    def _capture_errors(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Capture ERROR and above for every test in the class."""
+        caplog.set_level(logging.ERROR)
+
     def test_stagnation_error_has_recovery_steps(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig, caplog,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig, caplog,
     ) -> None:
         """Stagnation exit error message includes actionable recovery steps."""
         config.limits.max_iterations = 10
         config.stagnation.window_size = 3
         config.stagnation.low_turn_threshold = 2
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "Thinking..."),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=_NDJSON_LOW_TURN,
             research_result=mock_playwright_result(),
         )
 
         driver = LoopDriver(project_dir, config)
-        with caplog.at_level(logging.ERROR):
-            driver.run()
+        driver.run()
 
-        assert any("Recovery:" in r.message for r in caplog.records)
-        assert any("CLAUDE.md" in r.message for r in caplog.records)
+        text = _caplog_text(caplog)
+        assert "Recovery:" in text
+        assert "CLAUDE.md" in text
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_budget_error_has_iteration_count(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig, caplog,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig, caplog,
     ) -> None:
         """Budget exceeded message includes iteration count and metrics reference."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 10.0, 1, "Expensive"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=_NDJSON_OVER_BUDGET)
 
         driver = LoopDriver(project_dir, config)
-        with caplog.at_level(logging.ERROR):
-            driver.run()
+        driver.run()
 
-        assert any("metrics_summary.json" in r.message for r in caplog.records)
+        assert "metrics_summary.json" in _caplog_text(caplog)
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_timeout_stagnation_has_recovery_steps(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig, caplog,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig, caplog,
     ) -> None:
         """Consecutive timeout stagnation includes recovery guidance."""
         config.limits.max_iterations = 5
         config.stagnation.max_consecutive_timeouts = 2
 
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson="")
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
-        )
+        dispatchers(claude_ndjson="", research_result=mock_playwright_result())
 
         driver = LoopDriver(project_dir, config)
-        with caplog.at_level(logging.ERROR):
-            driver.run()
+        driver.run()
 
-        assert any("Recovery:" in r.message for r in caplog.records)
+        assert "Recovery:" in _caplog_text(caplog)
 
-    @patch("subprocess.run")
+    @pytest.mark.preflight
     def test_preflight_failure_has_recovery_steps(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig, caplog,
+        self, mock_run: MagicMock, project_template: Path, config: WorkflowConfig, caplog,
     ) -> None:
         """Preflight failure includes actionable recovery guidance."""
         mock_run.side_effect = FileNotFoundError("claude not found")
 
-        driver = LoopDriver(project_dir, config, dry_run=True)
-        with caplog.at_level(logging.ERROR):
-            driver._preflight_check()
+        driver = LoopDriver(project_template, config, dry_run=True)
+        driver._preflight_check()
 
-        assert any("taskkill" in r.message for r in caplog.records)
+        assert "taskkill" in _caplog_text(caplog)
 
 
+@pytest.mark.needs_workflow_files
 class TestVerificationIntegration:
     """Tests for plan verification in the loop driver."""
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_verification_enriches_prompt(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Verification critique is merged into the next prompt."""
         config.limits.max_iterations = 2
         config.verification.enabled = True
 
-        call_count = [0]
-        popen_prompts = []
-
-        def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
-                call_count[0] += 1
-                # Capture the prompt (3rd arg, after "claude", "-p")
-                prompt_idx = cmd.index("-p") + 1 if "-p" in cmd else 2
-                popen_prompts.append(cmd[prompt_idx])
-                return MockPopen(build_ndjson_stream(f"s{call_count[0]}", 0.01, 5, "Working..."))
-            return MockPopen("")
+        claude_calls: list[list[str]] = []
 
         def run_side_effect(*args, **kwargs):
             cmd = args[0] if args else kwargs.get("args", [])
@@ -1791,38 +1552,36 @@ class TestVerificationIntegration:
                 if cmd[0] == "git":
                     return mock_git_log_result()
                 if cmd[0] == "claude" and "--version" in cmd:
-                    return MagicMock(returncode=0, stdout="claude 1.0\n", stderr="")
-                if "council_browser" in str(cmd):
+                    return CLAUDE_VERSION_RESULT
+                if is_council_browser_cmd(cmd):
                     query_text = cmd[-1] if cmd else ""
-                    if "VERDICT" in query_text or "Critically evaluate" in query_text:
+                    if _VERIFICATION_RE.search(query_text):
                         return mock_verification_result("NEEDS_REVISION", "1. Missing error handling")
                     return mock_playwright_result("Next step: implement feature X")
-            return MagicMock(returncode=0, stdout="", stderr="")
+            return DEFAULT_RUN_RESULT
 
-        mock_popen.side_effect = popen_side_effect
+        monkeypatch.setattr(
+            "subprocess.Popen", make_counting_claude_popen(2, "Working...", claude_calls),
+        )
         mock_run.side_effect = run_side_effect
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
         # Second prompt should contain verification critique
+        popen_prompts = [_claude_prompt(c) for c in claude_calls]
         if len(popen_prompts) >= 2:
             assert "Plan Verification Critique" in popen_prompts[1]
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_verification_disabled_skips_query(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """No verification query when disabled."""
         config.limits.max_iterations = 2
         config.verification.enabled = False
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 5, "Working..."),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=_NDJSON_WORKING_5_TURNS,
             research_result=mock_playwright_result(),
         )
 
@@ -1830,15 +1589,11 @@ class TestVerificationIntegration:
         driver.run()
 
         # No verification trace events
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        event_types = [e["event_type"] for e in events]
+        event_types = _load_event_types(project_dir)
         assert "verification_start" not in event_types
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_verification_failure_uses_unverified(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Verification failure continues with unverified research."""
@@ -1853,18 +1608,16 @@ class TestVerificationIntegration:
                 if cmd[0] == "git":
                     return mock_git_log_result()
                 if cmd[0] == "claude" and "--version" in cmd:
-                    return MagicMock(returncode=0, stdout="claude 1.0\n", stderr="")
-                if "council_browser" in str(cmd):
+                    return CLAUDE_VERSION_RESULT
+                if is_council_browser_cmd(cmd):
                     call_count[0] += 1
                     if call_count[0] == 1:
                         return mock_playwright_result("Next steps...")
                     # Verification call fails
                     raise sp.TimeoutExpired(cmd="python", timeout=600)
-            return MagicMock(returncode=0, stdout="", stderr="")
+            return DEFAULT_RUN_RESULT
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 5, "Working..."),
-        )
+        monkeypatch.setattr("subprocess.Popen", _popen_dispatcher(_NDJSON_WORKING_5_TURNS))
         mock_run.side_effect = run_side_effect
 
         driver = LoopDriver(project_dir, config)
@@ -1873,10 +1626,8 @@ class TestVerificationIntegration:
         # Should not crash — falls back to unverified research
         assert exit_code == EXIT_MAX_ITERATIONS
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_verification_trace_events(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Trace has verification_start and verification_complete events."""
@@ -1889,84 +1640,65 @@ class TestVerificationIntegration:
                 if cmd[0] == "git":
                     return mock_git_log_result()
                 if cmd[0] == "claude" and "--version" in cmd:
-                    return MagicMock(returncode=0, stdout="claude 1.0\n", stderr="")
-                if "council_browser" in str(cmd):
+                    return CLAUDE_VERSION_RESULT
+                if is_council_browser_cmd(cmd):
                     query_text = cmd[-1] if cmd else ""
-                    if "VERDICT" in query_text or "Critically evaluate" in query_text:
+                    if _VERIFICATION_RE.search(query_text):
                         return mock_verification_result()
                     return mock_playwright_result("Next steps...")
-            return MagicMock(returncode=0, stdout="", stderr="")
+            return DEFAULT_RUN_RESULT
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 5, "Working..."),
-        )
+        monkeypatch.setattr("subprocess.Popen", _popen_dispatcher(_NDJSON_WORKING_5_TURNS))
         mock_run.side_effect = run_side_effect
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        event_types = [e["event_type"] for e in events]
-        assert "verification_start" in event_types
-        assert "verification_complete" in event_types
+        event_types = _load_event_types(project_dir)
+        assert {"verification_start", "verification_complete"} <= event_types
 
 
 class TestGitDiffStatsCapture:
     """Tests for _capture_git_diff_stats() in LoopDriver."""
 
-    @patch("subprocess.run")
-    def test_git_diff_stats_parses_output(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Parses git diff --stat summary line correctly."""
-        mock_run.return_value = mock_git_diff_stat_result(5, 120, 30)
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        stats = driver._capture_git_diff_stats()
-        assert stats is not None
-        assert stats["files_changed"] == 5
-        assert stats["insertions"] == 120
-        assert stats["deletions"] == 30
-
-    @patch("subprocess.run")
-    def test_git_diff_stats_not_git_repo(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Returns None when not a git repo."""
-        mock_run.return_value = MagicMock(returncode=128, stdout="", stderr="not a git repo")
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        stats = driver._capture_git_diff_stats()
-        assert stats is None
-
-    @patch("subprocess.run")
-    def test_git_diff_stats_timeout(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Returns None on timeout."""
-        mock_run.side_effect = sp.TimeoutExpired(cmd="git", timeout=10)
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        stats = driver._capture_git_diff_stats()
-        assert stats is None
-
-    @patch("subprocess.run")
-    def test_git_diff_stats_no_changes(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
+    @pytest.mark.parametrize(
+        ("return_value", "side_effect", "expected"),
+        [
+            pytest.param(
+                mock_git_diff_stat_result(5, 120, 30), None,
+                {"files_changed": 5, "insertions": 120, "deletions": 30},
+                id="parses_output",
+            ),
+            pytest.param(
+                mock_git_log_result(), None, None,
+                id="not_git_repo",
+            ),
+            pytest.param(
+                None, sp.TimeoutExpired(cmd="git", timeout=10), None,
+                id="timeout",
+            ),
+            pytest.param(
+                DEFAULT_RUN_RESULT, None, None,
+                id="no_changes",
+            ),
+        ],
+    )
+    def test_git_diff_stats(
+        self, mock_run: MagicMock, shared_driver: LoopDriver,
+        return_value: MagicMock | None, side_effect: Exception | None, expected: dict | None,
     ) -> None:
-        """Returns None when no changes (empty output)."""
-        mock_run.return_value = MagicMock(returncode=0, stdout="", stderr="")
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        stats = driver._capture_git_diff_stats()
-        assert stats is None
+        """Parses the --stat summary; None when not a repo, timed out or unchanged."""
+        mock_run.return_value = return_value
+        mock_run.side_effect = side_effect
+        assert shared_driver._capture_git_diff_stats() == expected
 
 
+@pytest.mark.needs_workflow_files
 class TestCycleTrackingInTrace:
     """Tests for tools_used/files_modified in trace and metrics."""
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_claude_complete_trace_includes_tools(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """claude_complete trace event includes tools_used and files_modified."""
         # Build NDJSON with tool use events
@@ -1989,15 +1721,13 @@ class TestCycleTrackingInTrace:
         ]
         ndjson_stream = "\n".join(ndjson_lines)
 
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson=ndjson_stream)
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=ndjson_stream)
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
         trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        complete_events = [e for e in events if e["event_type"] == "claude_complete"]
+        complete_events = _events_of_type(trace_path, "claude_complete")
         assert len(complete_events) >= 1
         ce = complete_events[0]
         assert "tools_used" in ce
@@ -2006,11 +1736,8 @@ class TestCycleTrackingInTrace:
         assert "files_modified" in ce
         assert "main.py" in ce["files_modified"]
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_metrics_summary_includes_tool_counts(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Metrics summary includes tool_usage_counts and total_files_modified."""
         ndjson_lines = [
@@ -2032,100 +1759,78 @@ class TestCycleTrackingInTrace:
         ]
         ndjson_stream = "\n".join(ndjson_lines)
 
-        mock_popen.side_effect = make_popen_dispatcher(claude_ndjson=ndjson_stream)
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=ndjson_stream)
 
         driver = LoopDriver(project_dir, config)
         driver.run()
 
         summary_path = project_dir / ".workflow" / "metrics_summary.json"
-        summary = json.loads(summary_path.read_text(encoding="utf-8"))
+        summary = json.loads(summary_path.read_bytes())
         assert "tool_usage_counts" in summary
         assert summary["tool_usage_counts"].get("Edit", 0) >= 1
         assert "total_files_modified" in summary
         assert "main.py" in summary["total_files_modified"]
 
 
+@pytest.mark.needs_workflow_files
 class TestPostExecutionValidation:
     """Tests for _run_post_validation() and validation loop integration."""
 
-    @patch("subprocess.run")
-    def test_validation_disabled_skips_subprocess(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Validation disabled returns skipped, no subprocess calls."""
-        config.validation.enabled = False
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        result = driver._run_post_validation()
-        assert result.success
-        assert result.data["skipped"] is True
-        # No subprocess.run calls for test command
-        mock_run.assert_not_called()
-
-    @patch("subprocess.run")
-    def test_validation_passes_continues(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Passing validation returns passed=True."""
-        config.validation.enabled = True
-        mock_run.return_value = mock_test_result(passed=True)
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        result = driver._run_post_validation()
-        assert result.success
-        assert result.data["passed"] is True
-
-    @patch("subprocess.run")
-    def test_validation_fails_returns_failure_data(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Failing validation returns passed=False with stdout_tail."""
-        config.validation.enabled = True
-        mock_run.return_value = mock_test_result(passed=False, stdout="FAILED test_foo")
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        result = driver._run_post_validation()
-        assert result.success  # Result itself is ok, the data says "failed"
-        assert result.data["passed"] is False
-        assert "FAILED" in result.data["stdout_tail"]
-
-    @patch("subprocess.run")
-    def test_validation_timeout_handled(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """Timeout returns skipped with timeout flag."""
-        config.validation.enabled = True
-        mock_run.side_effect = sp.TimeoutExpired(cmd="pytest", timeout=120)
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        result = driver._run_post_validation()
-        assert result.success
-        assert result.data.get("timeout") is True
-
-    @patch("subprocess.run")
-    def test_validation_command_not_found(
-        self, mock_run: MagicMock, project_dir: Path, config: WorkflowConfig,
-    ) -> None:
-        """FileNotFoundError returns Result.fail."""
-        config.validation.enabled = True
-        mock_run.side_effect = FileNotFoundError("pytest not found")
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        result = driver._run_post_validation()
-        assert not result.success
-        assert result.error_code == "FILE_NOT_FOUND"
+    @pytest.mark.parametrize(
+        ("enabled", "return_value", "side_effect", "expected_data", "error_code"),
+        [
+            pytest.param(False, None, None, {"skipped": True}, None, id="disabled_skips"),
+            pytest.param(
+                True, mock_test_result(passed=True), None, {"passed": True}, None,
+                id="passes",
+            ),
+            pytest.param(
+                True, mock_test_result(passed=False, stdout="FAILED test_foo"), None,
+                {"passed": False, "stdout_tail": "FAILED test_foo"}, None,
+                id="fails_returns_data",
+            ),
+            pytest.param(
+                True, None, sp.TimeoutExpired(cmd="pytest", timeout=120),
+                {"skipped": True, "timeout": True}, None,
+                id="timeout",
+            ),
+            pytest.param(
+                True, None, FileNotFoundError("pytest not found"), None, "FILE_NOT_FOUND",
+                id="command_not_found",
+            ),
+        ],
+    )
+    def test_run_post_validation(
+        self, mock_run: MagicMock, shared_driver: LoopDriver,
+        monkeypatch: pytest.MonkeyPatch,
+        enabled: bool, return_value: MagicMock | None, side_effect: Exception | None,
+        expected_data: dict | None, error_code: str | None,
+    ) -> None:
+        """Disabled skips the subprocess; failing tests are data, a missing command is Result.fail."""
+        monkeypatch.setattr(shared_driver.config.validation, "enabled", enabled)
+        mock_run.return_value = return_value
+        mock_run.side_effect = side_effect
+
+        result = shared_driver._run_post_validation()
+
+        assert mock_run.called is enabled
+        if error_code is not None:
+            assert not result.success
+            assert result.error_code == error_code
+        else:
+            assert result.success  # Result itself is ok, the data says "failed"
+            assert result.data.items() >= expected_data.items()
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_validation_fails_warn_continues_to_research(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """In warn mode, test failure logs warning but continues to research."""
         config.limits.max_iterations = 2
         config.validation.enabled = True
         config.validation.fail_action = "warn"
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 5, "Working..."),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=_NDJSON_WORKING_5_TURNS,
             research_result=mock_playwright_result(),
             test_result=mock_test_result(passed=False),
         )
@@ -2135,15 +1840,11 @@ class TestPostExecutionValidation:
         assert exit_code == EXIT_MAX_ITERATIONS
 
         # Verify research still happened
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        event_types = [e["event_type"] for e in events]
+        event_types = _load_event_types(project_dir)
         assert "research_start" in event_types
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_validation_fails_inject_skips_research(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """In inject mode, test failure feeds fix prompt to next iteration (skips research)."""
@@ -2152,19 +1853,10 @@ class TestPostExecutionValidation:
         config.validation.fail_action = "inject"
         config.validation.max_consecutive_failures = 5
 
-        popen_prompts = []
-        call_count = [0]
-
-        def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
-                call_count[0] += 1
-                prompt_idx = cmd.index("-p") + 1 if "-p" in cmd else 2
-                popen_prompts.append(cmd[prompt_idx])
-                return MockPopen(build_ndjson_stream(f"s{call_count[0]}", 0.01, 5, "Working..."))
-            return MockPopen("")
-
-        mock_popen.side_effect = popen_side_effect
+        claude_calls: list[list[str]] = []
+        monkeypatch.setattr(
+            "subprocess.Popen", make_counting_claude_popen(3, "Working...", claude_calls),
+        )
         mock_run.side_effect = make_subprocess_dispatcher(
             research_result=mock_playwright_result(),
             test_result=mock_test_result(passed=False, stdout="FAILED test_widget"),
@@ -2174,23 +1866,19 @@ class TestPostExecutionValidation:
         driver.run()
 
         # After first iteration fails tests in inject mode, next prompt should be fix prompt
+        popen_prompts = [_claude_prompt(c) for c in claude_calls]
         assert len(popen_prompts) >= 2
         assert "CRITICAL: Tests are failing" in popen_prompts[1]
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_validation_trace_events(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Trace includes validation_start and validation_complete events."""
         config.limits.max_iterations = 1
         config.validation.enabled = True
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 5, "Working..."),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=_NDJSON_WORKING_5_TURNS,
             research_result=mock_playwright_result(),
             test_result=mock_test_result(passed=True),
         )
@@ -2198,45 +1886,27 @@ class TestPostExecutionValidation:
         driver = LoopDriver(project_dir, config)
         driver.run()
 
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        event_types = [e["event_type"] for e in events]
-        assert "validation_start" in event_types
-        assert "validation_complete" in event_types
+        event_types = _load_event_types(project_dir)
+        assert {"validation_start", "validation_complete"} <= event_types
 
 
+@pytest.mark.needs_workflow_files
 class TestCompletionGate:
     """Tests for the completion gate feature that validates PROJECT_COMPLETE against a CLAUDE.md checklist."""
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_gate_rejects_unchecked_items(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """CLAUDE.md has unchecked items -> completion rejected, trace event emitted."""
         config.limits.max_iterations = 2
         # Write CLAUDE.md with unchecked gate items
-        (project_dir / "CLAUDE.md").write_text(
-            "# Project\n\n## Completion Gate\n- [ ] Task A\n- [x] Task B\n- [ ] Task C\n",
-            encoding="utf-8",
-        )
-
-        call_count = [0]
-
-        def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
-                call_count[0] += 1
-                return MockPopen(
-                    build_ndjson_stream(f"s{call_count[0]}", 0.01, 5, "All done. PROJECT_COMPLETE")
-                )
-            return MockPopen("")
+        _write_gate_md(project_dir, checked=["Task B"], unchecked=["Task A", "Task C"])
 
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
+        monkeypatch.setattr(
+            "subprocess.Popen", make_counting_claude_popen(2, "All done. PROJECT_COMPLETE"),
         )
+        mock_run.side_effect = _RESEARCH_RUN_DISPATCHER
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
@@ -2245,62 +1915,39 @@ class TestCompletionGate:
         assert exit_code != EXIT_COMPLETE
 
         # Trace should have completion_gate_rejected event
-        trace_path = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").strip().splitlines()]
-        event_types = [e["event_type"] for e in events]
+        event_types = _load_event_types(project_dir)
         assert "completion_gate_rejected" in event_types
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_gate_accepts_all_checked(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """All items checked -> completion accepted normally."""
-        (project_dir / "CLAUDE.md").write_text(
-            "# Project\n\n## Completion Gate\n- [x] Task A\n- [x] Task B\n- [x] Task C\n",
-            encoding="utf-8",
-        )
+        _write_gate_md(project_dir, checked=["Task A", "Task B", "Task C"])
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 5, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=_NDJSON_COMPLETE_5_TURNS)
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
         assert exit_code == EXIT_COMPLETE
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_gate_no_section_backward_compat(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """No '## Completion Gate' section at startup -> accepts (backward compat)."""
         # Default CLAUDE.md from fixture has no gate section
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 5, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=_NDJSON_COMPLETE_5_TURNS)
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
         assert exit_code == EXIT_COMPLETE
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_gate_deleted_during_execution_rejects(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Gate present at startup but deleted during execution -> rejects (evasion)."""
         # Write CLAUDE.md WITH a gate section at startup
-        claude_md = project_dir / "CLAUDE.md"
-        claude_md.write_text(
-            "# Project\n\n## Completion Gate\n- [ ] Task A\n- [ ] Task B\n",
-            encoding="utf-8",
-        )
+        claude_md = _write_gate_md(project_dir, unchecked=["Task A", "Task B"])
         config.limits.max_iterations = 4
         config.completion_gate.max_rejections = 3
 
@@ -2312,34 +1959,23 @@ class TestCompletionGate:
             # On first call, Claude deletes the gate section
             if call_count == 1:
                 claude_md.write_text("# Project\nNo gate here.\n", encoding="utf-8")
-            return make_popen_dispatcher(
-                claude_ndjson=build_ndjson_stream("s1", 0.01, 5, "PROJECT_COMPLETE"),
-            )(*args, **kwargs)
+            return _popen_dispatcher(_NDJSON_COMPLETE_5_TURNS)(*args, **kwargs)
 
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = make_subprocess_dispatcher()
+        monkeypatch.setattr("subprocess.Popen", popen_side_effect)
+        mock_run.side_effect = _DEFAULT_RUN_DISPATCHER
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
         assert exit_code == EXIT_STAGNATION  # Rejected 3x -> stagnation
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_gate_disabled_via_config(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Gate disabled via config -> accepts even with unchecked items."""
         config.completion_gate.enabled = False
-        (project_dir / "CLAUDE.md").write_text(
-            "# Project\n\n## Completion Gate\n- [ ] Unchecked task\n",
-            encoding="utf-8",
-        )
+        _write_gate_md(project_dir, unchecked=["Unchecked task"])
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 5, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=_NDJSON_COMPLETE_5_TURNS)
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
@@ -2374,61 +2010,63 @@ class TestCompletionGate:
         assert "Still unchecked" in unchecked
         # "This should NOT be parsed" is after ## Next Section, so excluded
 
+    @pytest.mark.parametrize(
+        "content",
+        [
+            pytest.param(
+                "# Project\r## Completion Gate\r- [x] Done\r- [ ] Todo\r## Next\r- [ ] Outside\r",
+                id="lone_cr",
+            ),
+            pytest.param(
+                "# Project\n## Completion Gate\r\n- [x] Done\r- [ ] Todo\n## Next\r\n- [ ] Outside\r",
+                id="mixed",
+            ),
+        ],
+    )
+    def test_gate_parser_line_endings(
+        self, shared_driver: LoopDriver, project_dir: Path, content: str,
+    ) -> None:
+        """Lone CR and mixed line endings split lines like universal newlines."""
+        (project_dir / "CLAUDE.md").write_bytes(content.encode("utf-8"))
+        checked, unchecked = shared_driver._parse_completion_gate(project_dir / "CLAUDE.md")
+        assert checked == ["Done"]
+        assert unchecked == ["Todo"]
+
     def test_gate_parser_empty_section(
-        self, project_dir: Path, config: WorkflowConfig,
+        self, shared_driver: LoopDriver, project_dir: Path,
     ) -> None:
         """Empty gate section returns empty lists."""
         (project_dir / "CLAUDE.md").write_text(
             "# Project\n\n## Completion Gate\n\n## Next\n",
             encoding="utf-8",
         )
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        checked, unchecked = driver._parse_completion_gate(project_dir / "CLAUDE.md")
+        checked, unchecked = shared_driver._parse_completion_gate(project_dir / "CLAUDE.md")
         assert checked == []
         assert unchecked == []
 
     def test_gate_parser_missing_file(
-        self, project_dir: Path, config: WorkflowConfig,
+        self, shared_driver: LoopDriver, project_dir: Path,
     ) -> None:
         """Missing CLAUDE.md returns empty lists (no crash)."""
-        driver = LoopDriver(project_dir, config, dry_run=True, skip_preflight=True)
-        checked, unchecked = driver._parse_completion_gate(project_dir / "NONEXISTENT.md")
+        checked, unchecked = shared_driver._parse_completion_gate(project_dir / "NONEXISTENT.md")
         assert checked == []
         assert unchecked == []
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_gate_rejection_sets_next_prompt(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """After rejection, loop continues with rejection text in prompt (doesn't exit complete)."""
         config.limits.max_iterations = 3
         config.completion_gate.max_rejections = 5  # High so we don't hit stagnation
 
-        (project_dir / "CLAUDE.md").write_text(
-            "# Project\n\n## Completion Gate\n- [ ] Unfinished work\n",
-            encoding="utf-8",
-        )
-
-        popen_prompts: list[str] = []
-        call_count = [0]
-
-        def popen_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get("args", [])
-            if isinstance(cmd, list) and cmd and cmd[0] == "claude":
-                call_count[0] += 1
-                prompt_idx = cmd.index("-p") + 1 if "-p" in cmd else 2
-                popen_prompts.append(cmd[prompt_idx])
-                return MockPopen(
-                    build_ndjson_stream(f"s{call_count[0]}", 0.01, 5, "PROJECT_COMPLETE")
-                )
-            return MockPopen("")
+        _write_gate_md(project_dir, unchecked=["Unfinished work"])
 
-        mock_popen.side_effect = popen_side_effect
-        mock_run.side_effect = make_subprocess_dispatcher(
-            research_result=mock_playwright_result(),
+        claude_calls: list[list[str]] = []
+        monkeypatch.setattr(
+            "subprocess.Popen", make_counting_claude_popen(3, "PROJECT_COMPLETE", claude_calls),
         )
+        mock_run.side_effect = _RESEARCH_RUN_DISPATCHER
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
@@ -2436,29 +2074,22 @@ class TestCompletionGate:
         # Should hit max iterations (not EXIT_COMPLETE), since gate keeps rejecting
         assert exit_code == EXIT_MAX_ITERATIONS
         # Second prompt should contain rejection feedback
+        popen_prompts = [_claude_prompt(c) for c in claude_calls]
         assert len(popen_prompts) >= 2
         assert "COMPLETION REJECTED" in popen_prompts[1]
         assert "unchecked" in popen_prompts[1].lower()
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_gate_max_rejections_exits_stagnation(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """After max_rejections consecutive rejections, exits with EXIT_STAGNATION (code 3)."""
         config.limits.max_iterations = 10
         config.completion_gate.max_rejections = 3
 
-        (project_dir / "CLAUDE.md").write_text(
-            "# Project\n\n## Completion Gate\n- [ ] Never completed\n",
-            encoding="utf-8",
-        )
+        _write_gate_md(project_dir, unchecked=["Never completed"])
 
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 5, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=_NDJSON_COMPLETE_5_TURNS,
             research_result=mock_playwright_result(),
         )
 
@@ -2468,20 +2099,16 @@ class TestCompletionGate:
         assert driver._gate_rejection_count == 3
 
 
+@pytest.mark.needs_workflow_files
 class TestPostReview:
     """Tests for post-completion Perplexity quality review."""
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_post_review_called_on_completion(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """_run_post_review() is called on successful completion."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=_NDJSON_COMPLETE,
             research_result=mock_post_review_result(),
         )
 
@@ -2493,18 +2120,12 @@ class TestPostReview:
         review_file = project_dir / ".workflow" / "post_review.md"
         assert review_file.exists()
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_post_review_disabled_skips(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Post-review is skipped when disabled in config."""
         config.post_review.enabled = False
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher()
+        dispatchers(claude_ndjson=_NDJSON_COMPLETE)
 
         driver = LoopDriver(project_dir, config)
         exit_code = driver.run()
@@ -2514,16 +2135,12 @@ class TestPostReview:
         review_file = project_dir / ".workflow" / "post_review.md"
         assert not review_file.exists()
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_post_review_failure_does_not_block_completion(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch,
         project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """Post-review failure logs warning but still exits 0."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "PROJECT_COMPLETE"),
-        )
+        monkeypatch.setattr("subprocess.Popen", _popen_dispatcher(_NDJSON_COMPLETE))
 
         call_count = [0]
 
@@ -2533,11 +2150,11 @@ class TestPostReview:
                 if cmd[0] == "git":
                     return mock_git_log_result()
                 if cmd[0] == "claude" and len(cmd) >= 2 and cmd[1] == "--version":
-                    return MagicMock(returncode=0, stdout="claude 1.0.0\n", stderr="")
-                if "council_browser" in str(cmd):
+                    return CLAUDE_VERSION_RESULT
+                if is_council_browser_cmd(cmd):
                     call_count[0] += 1
                     raise sp.TimeoutExpired(cmd="python", timeout=600)
-            return MagicMock(returncode=0, stdout="", stderr="")
+            return DEFAULT_RUN_RESULT
 
         mock_run.side_effect = dispatcher
 
@@ -2546,17 +2163,12 @@ class TestPostReview:
         # Still completes successfully despite review failure
         assert exit_code == EXIT_COMPLETE
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_post_review_writes_trace_events(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """_run_post_review writes post_review_start and post_review_complete trace events."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=_NDJSON_COMPLETE,
             research_result=mock_post_review_result(),
         )
 
@@ -2565,24 +2177,16 @@ class TestPostReview:
         assert exit_code == EXIT_COMPLETE
 
         # Check trace.jsonl for post_review events
-        trace_file = project_dir / ".workflow" / "trace.jsonl"
-        assert trace_file.exists()
-        events = [json.loads(line) for line in trace_file.read_text(encoding="utf-8").strip().splitlines()]
-        event_types = [e["event_type"] for e in events]
-        assert "post_review_start" in event_types
-        assert "post_review_complete" in event_types
+        assert (project_dir / ".workflow" / "trace.jsonl").exists()
+        event_types = _load_event_types(project_dir)
+        assert {"post_review_start", "post_review_complete"} <= event_types
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_post_review_between_save_and_summary(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path, config: WorkflowConfig,
+        self, dispatchers: Callable[..., None], project_dir: Path, config: WorkflowConfig,
     ) -> None:
         """post_review_start occurs after completion_detected and before loop_end."""
-        mock_popen.side_effect = make_popen_dispatcher(
-            claude_ndjson=build_ndjson_stream("s1", 0.01, 1, "PROJECT_COMPLETE"),
-        )
-        mock_run.side_effect = make_subprocess_dispatcher(
+        dispatchers(
+            claude_ndjson=_NDJSON_COMPLETE,
             research_result=mock_post_review_result(),
         )
 
@@ -2591,7 +2195,7 @@ class TestPostReview:
         assert exit_code == EXIT_COMPLETE
 
         trace_file = project_dir / ".workflow" / "trace.jsonl"
-        events = [json.loads(line) for line in trace_file.read_text(encoding="utf-8").strip().splitlines()]
+        events = _load_trace(trace_file)
         event_types = [e["event_type"] for e in events]
 
         # Verify ordering: completion_detected -> post_review_start -> loop_end
@@ -2600,11 +2204,8 @@ class TestPostReview:
         loop_end_idx = event_types.index("loop_end")
         assert completion_idx < review_idx < loop_end_idx
 
-    @patch("subprocess.Popen")
-    @patch("subprocess.run")
     def test_post_review_config_in_workflow_config(
-        self, mock_run: MagicMock, mock_popen: MagicMock,
-        project_dir: Path,
+        self, mock_run: MagicMock, project_dir: Path,
     ) -> None:
         """WorkflowConfig includes post_review field with defaults."""
         cfg = WorkflowConfig()
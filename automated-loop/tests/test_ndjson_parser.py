@@ -84,31 +84,46 @@ CONTENT_BLOCK_START_EVENT = json.dumps({
     },
 })
 
+# Event lists shared by the processing/extraction tests, parsed once at import.
+# process_events and extract_result only read events, so reuse is safe.
+_INIT_RESULT_EVENTS = parse_ndjson_string(f"{INIT_EVENT}\n{RESULT_EVENT}")
+_INIT_ASSISTANT_RESULT_EVENTS = parse_ndjson_string(
+    f"{INIT_EVENT}\n{ASSISTANT_EVENT}\n{RESULT_EVENT}"
+)
+_INIT_THINKING_RESULT_EVENTS = parse_ndjson_string(
+    f"{INIT_EVENT}\n{THINKING_EVENT}\n{RESULT_EVENT}"
+)
+_INIT_CONTENT_BLOCK_RESULT_EVENTS = parse_ndjson_string(
+    f"{INIT_EVENT}\n{CONTENT_BLOCK_START_EVENT}\n{RESULT_EVENT}"
+)
+
 
 class TestParseNdjsonLine:
-    def test_parse_init_event(self) -> None:
-        event = parse_ndjson_line(INIT_EVENT)
+    @pytest.mark.parametrize(
+        ("line", "expected_type"),
+        [
+            pytest.param(INIT_EVENT, "init", id="init"),
+            pytest.param(RESULT_EVENT, "result", id="result"),
+            pytest.param(f"  {INIT_EVENT}  ", "init", id="whitespace_padded"),
+        ],
+    )
+    def test_parse_event(self, line: str, expected_type: str) -> None:
+        event = parse_ndjson_line(line)
         assert event is not None
-        assert event.type == "init"
+        assert event.type == expected_type
         assert event.session_id == "abc-123-def"
-
-    def test_parse_result_event(self) -> None:
-        event = parse_ndjson_line(RESULT_EVENT)
-        assert event is not None
-        assert event.type == "result"
-        assert event.raw["total_cost_usd"] == 0.042
-
-    def test_parse_empty_line(self) -> None:
-        assert parse_ndjson_line("") is None
-        assert parse_ndjson_line("   ") is None
-
-    def test_parse_malformed_json(self) -> None:
-        assert parse_ndjson_line("not json {{{") is None
-
-    def test_parse_whitespace_padded(self) -> None:
-        event = parse_ndjson_line(f"  {INIT_EVENT}  ")
-        assert event is not None
-        assert event.type == "init"
+        assert event.raw == json.loads(line)
+
+    @pytest.mark.parametrize(
+        "line",
+        [
+            pytest.param("", id="empty"),
+            pytest.param("   ", id="blank"),
+            pytest.param("not json {{{", id="malformed"),
+        ],
+    )
+    def test_parse_returns_none(self, line: str) -> None:
+        assert parse_ndjson_line(line) is None
 
 
 class TestParseNdjsonString:
@@ -134,13 +149,11 @@ class TestParseNdjsonString:
 
 class TestProcessEvents:
     def test_extracts_session_id(self) -> None:
-        events = parse_ndjson_string(f"{INIT_EVENT}\n{RESULT_EVENT}")
-        parsed = process_events(events)
+        parsed = process_events(_INIT_RESULT_EVENTS)
         assert parsed.session_id == "abc-123-def"
 
     def test_extracts_result(self) -> None:
-        events = parse_ndjson_string(f"{INIT_EVENT}\n{RESULT_EVENT}")
-        parsed = process_events(events)
+        parsed = process_events(_INIT_RESULT_EVENTS)
 
         assert parsed.result is not None
         assert parsed.result.session_id == "abc-123-def"
@@ -148,33 +161,35 @@ class TestProcessEvents:
         assert parsed.result.num_turns == 3
         assert parsed.result.is_error is False
 
-    def test_extracts_assistant_text(self) -> None:
-        events = parse_ndjson_string(f"{INIT_EVENT}\n{ASSISTANT_EVENT}\n{RESULT_EVENT}")
-        parsed = process_events(events)
-        assert "I'll implement the feature now." in parsed.assistant_text
-
-    def test_extracts_thinking_text(self) -> None:
-        events = parse_ndjson_string(f"{INIT_EVENT}\n{THINKING_EVENT}\n{RESULT_EVENT}")
-        parsed = process_events(events)
-        assert "Let me analyze the codebase" in parsed.thinking_text
-
-    def test_tracks_tools_used(self) -> None:
-        events = parse_ndjson_string(f"{INIT_EVENT}\n{ASSISTANT_EVENT}\n{RESULT_EVENT}")
-        parsed = process_events(events)
-        assert "Write" in parsed.tools_used
-
-    def test_tracks_files_modified(self) -> None:
-        events = parse_ndjson_string(f"{INIT_EVENT}\n{ASSISTANT_EVENT}\n{RESULT_EVENT}")
-        parsed = process_events(events)
-        assert "/tmp/test.py" in parsed.files_modified
-
-    def test_tracks_files_from_content_block_start(self) -> None:
-        events = parse_ndjson_string(
-            f"{INIT_EVENT}\n{CONTENT_BLOCK_START_EVENT}\n{RESULT_EVENT}"
-        )
+    @pytest.mark.parametrize(
+        ("events", "attr", "expected"),
+        [
+            pytest.param(
+                _INIT_ASSISTANT_RESULT_EVENTS, "assistant_text",
+                "I'll implement the feature now.", id="assistant_text",
+            ),
+            pytest.param(
+                _INIT_THINKING_RESULT_EVENTS, "thinking_text",
+                "Let me analyze the codebase", id="thinking_text",
+            ),
+            pytest.param(_INIT_ASSISTANT_RESULT_EVENTS, "tools_used", "Write", id="tools_used"),
+            pytest.param(
+                _INIT_ASSISTANT_RESULT_EVENTS, "files_modified", "/tmp/test.py",
+                id="files_modified",
+            ),
+            pytest.param(
+                _INIT_CONTENT_BLOCK_RESULT_EVENTS, "tools_used", "Edit",
+                id="tools_from_content_block_start",
+            ),
+            pytest.param(
+                _INIT_CONTENT_BLOCK_RESULT_EVENTS, "files_modified", "/tmp/config.py",
+                id="files_from_content_block_start",
+            ),
+        ],
+    )
+    def test_extracts(self, events: list[ClaudeEvent], attr: str, expected: str) -> None:
         parsed = process_events(events)
-        assert "Edit" in parsed.tools_used
-        assert "/tmp/config.py" in parsed.files_modified
+        assert expected in getattr(parsed, attr)
 
     def test_deduplicates_files_modified(self) -> None:
         # Two events modifying same file
@@ -193,8 +208,7 @@ class TestProcessEvents:
 
 class TestExtractResult:
     def test_extract_from_events(self) -> None:
-        events = parse_ndjson_string(f"{INIT_EVENT}\n{ASSISTANT_EVENT}\n{RESULT_EVENT}")
-        result = extract_result(events)
+        result = extract_result(_INIT_ASSISTANT_RESULT_EVENTS)
         assert result is not None
         assert result.session_id == "abc-123-def"
         assert result.cost_usd == 0.042
@@ -329,11 +329,11 @@ class TestRetryAndCircuitBreaker:
 
         assert not result.success
         assert result.error_code == "SCRIPT_NOT_FOUND"
-        council_calls = [
-            c for c in mock_run.call_args_list
-            if c[0] and isinstance(c[0][0], list) and c[0][0][0] != "git"
-        ]
-        assert len(council_calls) == 1
+        council_calls = sum(
+            1 for c in mock_run.call_args_list
+            if c.args and isinstance(c.args[0], list) and c.args[0][0] != "git"
+        )
+        assert council_calls == 1
 
     @patch("research_bridge.time.sleep")
     @patch("research_bridge.subprocess.run")
@@ -29,7 +29,7 @@ class TestStateTracker:
         state_file = project_dir / ".workflow" / "state.json"
         assert state_file.exists()
 
-        data = json.loads(state_file.read_text(encoding="utf-8"))
+        data = json.loads(state_file.read_bytes())
         assert data["iteration"] == 0
         assert data["status"] == "idle"
 
@@ -251,7 +251,7 @@ class TestStateVersion:
         tracker.save()
 
         state_file = project_dir / ".workflow" / "state.json"
-        data = json.loads(state_file.read_text(encoding="utf-8"))
+        data = json.loads(state_file.read_bytes())
         assert data["version"] == CURRENT_STATE_VERSION
 
 